@@ -5,3 +5,4 @@ TOKEN = getenv("TOKEN")
 DEFAULT_PREFIX = getenv("DEFAULT_PREFIX")
 
 LOG_FUNNEL_WEBHOOK = getenv("LOG_FUNNEL_WEBHOOK", None)
+SLOW_QUERY_THRESHOLD = float(getenv("SLOW_QUERY_THRESHOLD", "0.25"))  # in seconds.
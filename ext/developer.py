@@ -3,7 +3,9 @@ from __future__ import annotations
 import discord
 from discord.ext import commands
 
-from typing import TYPE_CHECKING, Optional
+from utils import to_cb, clamp
+
+from typing import TYPE_CHECKING, Literal, Optional
 
 if TYPE_CHECKING:
     from utils import Estella
@@ -22,6 +24,45 @@ class Developer(commands.Cog):
             f"Synced {len(commands)} command{['s', ''][len(commands) == 1]}.",
         )
 
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def dbstats(
+        self,
+        ctx: commands.Context[Estella],
+        sort: Literal["total", "mean", "max", "count"] = "total",
+        limit: int = 10,
+    ):
+        """
+        Shows how long acquiring a connection waits, and the statements taking up the most time.
+        """
+
+        stats = ctx.bot.pool.stats
+
+        def ms(seconds: float) -> str:
+            return f"{seconds * 1000:.1f}ms"
+
+        acquire = stats.acquire
+        lines = [
+            f"acquire: {acquire.count} waits, p50 {ms(acquire.percentile(50))}, "
+            f"p95 {ms(acquire.percentile(95))}, max {ms(acquire.max)}",
+            "",
+        ]
+
+        statements = sorted(
+            stats.statements.items(),
+            key=lambda item: getattr(item[1], sort),
+            reverse=True,
+        )
+
+        for statement, histogram in statements[:limit]:
+            lines.append(
+                f"{histogram.count:>6}x  total {ms(histogram.total):>9}  "
+                f"mean {ms(histogram.mean):>8}  p95 {ms(histogram.percentile(95)):>8}  "
+                f"max {ms(histogram.max):>8}\n    {clamp(statement, length=120)}"
+            )
+
+        await ctx.send(to_cb(clamp("\n".join(lines), length=1900)))
+
     @commands.group(aliases=["bl"], invoke_without_command=True, hidden=True)
     @commands.is_owner()
     async def blacklist(self, ctx: commands.Context[Estella]):
@@ -48,6 +89,8 @@ class Developer(commands.Cog):
                 reason,
             )
 
+        ctx.bot.blacklisted.add(user.id)
+
         await ctx.send(f"Added {user.mention} to the bot blacklist.")
 
     @blacklist.command()
@@ -62,18 +105,9 @@ class Developer(commands.Cog):
                 user.id,
             )
 
-        await ctx.send(f"Removed {user.mention} from the bot blacklist.")
-
-    async def is_owner(self, user_id: int) -> bool:
-        if self.bot.owner_id:
-            return user_id == self.bot.owner_id
+        ctx.bot.blacklisted.discard(user.id)
 
-        if self.bot.owner_ids:
-            return user_id in self.bot.owner_ids
-
-        # this would only be called once and would be a cached call later.
-        user = await self.bot.fetch_user(user_id)
-        return await self.bot.is_owner(user)
+        await ctx.send(f"Removed {user.mention} from the bot blacklist.")
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
@@ -81,7 +115,7 @@ class Developer(commands.Cog):
         if (
             self.bot.user
             and payload.emoji.name[:-1] == "\U0001f5d1"
-            and await self.is_owner(payload.user_id)
+            and self.bot.is_owner_id(payload.user_id)
             and payload.message_author_id == self.bot.user.id
         ):
             await self.bot.http.delete_message(payload.channel_id, payload.message_id)
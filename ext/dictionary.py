@@ -4,17 +4,27 @@ import discord
 from discord.ext import commands
 from discord import ui, app_commands
 
+import os
+import json
+import time
+import asyncio
+import pathlib
+
 from io import BytesIO
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlparse
 
-from libs.dictcc import DictCC, word_autocomplete_for
+from libs.dictcc import DictCC, DefinitionCache, OfflineIndexes, word_autocomplete_for
 
-from utils import generate_waveform_from_audio
+from utils import logger, generate_waveform_from_audio, run_in_executor
 from utils.views import BaseView
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, NamedTuple, Optional
 
 if TYPE_CHECKING:
-    from typing import Any, Self
+    from typing import Any, Awaitable, Callable, Self
+
+    from aiohttp import ClientSession
 
     from utils import Estella
 
@@ -24,12 +34,268 @@ if TYPE_CHECKING:
 GERMAN_RED = 0xFF0000
 SWEDISH_YELLOW = 0xFFCD00
 
+DEFINITION_TTL = 30 * 24 * 60 * 60  # dict.cc's entries rarely ever change.
+
+# built with `python -m libs.dictcc.index`, as `{lang}.idx`.
+INDEX_PATH = pathlib.Path("db/dictcc")
+
+PRONUNCIATIONS_PATH = pathlib.Path("db/pronunciations")
+PRONUNCIATIONS_MAX_BYTES = 64 * 1024 * 1024
+
+# recordings do get added over time, so a missing one is checked again after a while.
+MISSING_PRONUNCIATION_TTL = 24 * 60 * 60
+
+
+class Pronunciation(NamedTuple):
+    audio: bytes
+    waveform: str
+    duration_secs: float
+
+
+class PronunciationCache:
+    """
+    Recordings along with their waveform, kept on disk (as `{key}.mp3` and `{key}.json`) up to
+    `max_bytes`, evicting the least recently used ones.
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        *,
+        max_bytes: int = PRONUNCIATIONS_MAX_BYTES,
+        missing_ttl: float = MISSING_PRONUNCIATION_TTL,
+        missing_size: int = 1024,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+
+        self.missing_ttl = missing_ttl
+        self.missing_size = missing_size
+
+        self._sizes: OrderedDict[str, int] = OrderedDict()  # key -> bytes on disk
+        # words dict.cc has no recording of, key -> expires at.
+        self._missing: OrderedDict[str, float] = OrderedDict()
+        self._pending: dict[str, asyncio.Task[Optional[Pronunciation]]] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def size(self) -> int:
+        return sum(self._sizes.values())
+
+    def populate(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        # modification times are bumped on every use, so they're the recency order.
+        files = sorted(self.path.glob("*.mp3"), key=lambda file: file.stat().st_mtime)
+
+        for file in files:
+            metadata = file.with_suffix(".json")
+            if not metadata.exists():
+                file.unlink()
+                continue
+
+            self._sizes[file.stem] = file.stat().st_size + metadata.stat().st_size
+
+        self._evict()
+
+    @staticmethod
+    def key(audio_url: str) -> Optional[str]:
+        query = parse_qs(urlparse(audio_url).query)
+
+        # ids are only unique within a language pair.
+        parts = [
+            query.get("lp", [""])[0],
+            query.get("lang", [""])[0].removesuffix("_rec_ip"),
+            query.get("id", [""])[0],
+        ]
+
+        if not all(part.isalnum() for part in parts):
+            return None
+
+        return "_".join(parts)
+
+    async def get(
+        self,
+        audio_url: str,
+        *,
+        session: ClientSession,
+    ) -> Optional[Pronunciation]:
+        key = self.key(audio_url)
+        if not key:
+            try:
+                return await self._fetch(audio_url, session=session)
+            except Exception as err:
+                logger.warning(
+                    "Failed to fetch the pronunciation %s: %s", audio_url, err
+                )
+                return None
+
+        if self._is_missing(key):
+            return None
+
+        if key in self._sizes:
+            cached = await self._read(key)
+            if cached:
+                self.hits += 1
+                return cached
+
+        self.misses += 1
+
+        # pressing the button on a few messages at once only fetches it the once.
+        task = self._pending.get(key)
+        if not task:
+            task = self._pending[key] = asyncio.create_task(
+                self._fetch_and_store(key, audio_url, session=session)
+            )
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+
+        return await asyncio.shield(task)
+
+    async def _fetch(
+        self,
+        audio_url: str,
+        *,
+        session: ClientSession,
+    ) -> Optional[Pronunciation]:
+        """
+        Returns `None` if dict.cc doesn't have a recording, and raises if it couldn't tell.
+        """
+
+        async with session.get(audio_url) as req:
+            if req.status == 200 and req.content_type.startswith("text/"):
+                # `error_as_text` has it answer with a short message, rather than a page.
+                text = await req.text()
+                if len(text) < 256 and "<" not in text:
+                    return None
+
+            if req.status != 200 or req.content_type != "audio/mpeg":
+                raise Exception(
+                    f"Recieved an {req.status} status code ({req.content_type}) "
+                    f"while fetching: {audio_url}"
+                )
+
+            audio = await req.read()
+
+        waveform, duration_secs = await generate_waveform_from_audio(audio)
+        return Pronunciation(audio, waveform, duration_secs)
+
+    async def _fetch_and_store(
+        self,
+        key: str,
+        audio_url: str,
+        *,
+        session: ClientSession,
+    ) -> Optional[Pronunciation]:
+        try:
+            pronunciation = await self._fetch(audio_url, session=session)
+        except Exception as err:
+            # not remembered as missing, it's likely just dict.cc having a moment.
+            logger.warning("Failed to fetch the pronunciation %s: %s", key, err)
+            return None
+
+        if not pronunciation:
+            self._set_missing(key)
+            return None
+
+        try:
+            self._sizes[key] = await self._write(key, pronunciation)
+        except OSError as err:
+            logger.error("Failed to cache the pronunciation %s: %s", key, err)
+        else:
+            self._evict()
+
+        return pronunciation
+
+    def _is_missing(self, key: str) -> bool:
+        expires_at = self._missing.get(key)
+        if expires_at is None:
+            return False
+
+        if expires_at <= time.monotonic():
+            del self._missing[key]
+            return False
+
+        return True
+
+    def _set_missing(self, key: str):
+        self._missing[key] = time.monotonic() + self.missing_ttl
+        self._missing.move_to_end(key)
+
+        if len(self._missing) > self.missing_size:
+            self._missing.popitem(last=False)
+
+    async def _read(self, key: str) -> Optional[Pronunciation]:
+        self._sizes.move_to_end(key)
+
+        try:
+            return await self._read_files(key)
+        except (OSError, ValueError) as err:
+            logger.error("Failed to read the cached pronunciation %s: %s", key, err)
+            self._remove(key)
+
+            return None
+
+    @run_in_executor
+    def _read_files(self, key: str) -> Pronunciation:
+        file = self.path / f"{key}.mp3"
+        metadata = json.loads(file.with_suffix(".json").read_text())
+
+        os.utime(file)
+        return Pronunciation(
+            file.read_bytes(), metadata["waveform"], metadata["duration_secs"]
+        )
+
+    @run_in_executor
+    def _write(self, key: str, pronunciation: Pronunciation) -> int:
+        file = self.path / f"{key}.mp3"
+        metadata = file.with_suffix(".json")
+
+        file.write_bytes(pronunciation.audio)
+        metadata.write_text(
+            json.dumps(
+                {
+                    "waveform": pronunciation.waveform,
+                    "duration_secs": pronunciation.duration_secs,
+                }
+            )
+        )
+
+        return file.stat().st_size + metadata.stat().st_size
+
+    def _remove(self, key: str):
+        self._sizes.pop(key, None)
+
+        for suffix in (".mp3", ".json"):
+            (self.path / f"{key}{suffix}").unlink(missing_ok=True)
+
+    def _evict(self):
+        size = self.size
+
+        while size > self.max_bytes and self._sizes:
+            key = next(iter(self._sizes))
+            size -= self._sizes[key]
+
+            self._remove(key)
+
 
 class DefinitionView(BaseView):
-    def __init__(self, audio_url: str, btn_label: str, *args: Any, **kwargs: Any):
+    def __init__(
+        self,
+        audio_url: str,
+        btn_label: str,
+        *args: Any,
+        pronunciations: PronunciationCache,
+        resolve_audio_url: Optional[Callable[[], Awaitable[Optional[str]]]] = None,
+        **kwargs: Any,
+    ):
         super().__init__(*args, **kwargs)
 
         self.audio_url = audio_url
+        self.pronunciations = pronunciations
+        # for definitions without an `audio_url`, e.g. ones answered from the index.
+        self.resolve_audio_url = resolve_audio_url
 
         self.btn: ui.Button[Self] = ui.Button(label=btn_label)
         self.btn.callback = self.pronounciation
@@ -37,43 +303,71 @@ class DefinitionView(BaseView):
 
     async def pronounciation(self, interaction: Interaction):
         assert interaction.channel
-        
+
         self.btn.disabled = True
         await interaction.response.edit_message(view=self)
-        
-        message = await interaction.original_response()
 
-        async with interaction.client.session.get(self.audio_url) as req:
-            if req.content_type != "audio/mpeg":
-                return await message.reply(
-                    "I couldn't find any audio recording for this word."
-                )
+        message = await interaction.original_response()
 
-            audio = BytesIO(await req.read())
+        if not self.audio_url and self.resolve_audio_url:
+            self.audio_url = await self.resolve_audio_url() or ""
 
-            file = discord.File(audio, filename="pronounciation.mp3")
-            waveform, duration_secs = await generate_waveform_from_audio(file.fp.read())
-            file.reset()
+        pronunciation = (
+            await self.pronunciations.get(
+                self.audio_url,
+                session=interaction.client.session,
+            )
+            if self.audio_url
+            else None
+        )
 
-            await interaction.client.send_voice_message(
-                interaction.channel.id,
-                file,
-                waveform=waveform,
-                duration_secs=duration_secs,
-                reference=message,
+        if not pronunciation:
+            return await message.reply(
+                "I couldn't find any audio recording for this word."
             )
 
+        file = discord.File(
+            BytesIO(pronunciation.audio),
+            filename="pronounciation.mp3",
+        )
+
+        await interaction.client.send_voice_message(
+            interaction.channel.id,
+            file,
+            waveform=pronunciation.waveform,
+            duration_secs=pronunciation.duration_secs,
+            reference=message,
+        )
+
 
 class Dictionary(commands.Cog):
     def __init__(self, bot: Estella):
         self.bot = bot
 
-        self.dictcc = DictCC(session=bot.session)
+        self.definitions = DefinitionCache(bot, ttl=DEFINITION_TTL)
+        self.index = OfflineIndexes(INDEX_PATH)
+        self.pronunciations = PronunciationCache(PRONUNCIATIONS_PATH)
+        self.dictcc = DictCC(
+            session=bot.session,
+            definitions=self.definitions,
+            index=self.index,
+        )
         self.SECTION_LIMIT = 3
         self.IGNORED_SECTIONS = [
             "Substantive",
         ]
 
+    async def cog_load(self):
+        await self.definitions.prune()
+        self.pronunciations.populate()
+
+        return await super().cog_load()
+
+    async def cog_unload(self):
+        self.index.close()
+
+        return await super().cog_unload()
+
     async def _handle_dictionary_query(
         self,
         interaction: Interaction,
@@ -127,12 +421,32 @@ class Dictionary(commands.Cog):
             colour=colour,
         )
 
+        async def resolve_audio_url() -> Optional[str]:
+            # definitions answered from the index don't know their recording.
+            try:
+                fetched = await self.dictcc.fetch_definition(word, _from=_from, _to=_to)
+            except Exception as err:
+                logger.warning("Failed to look up the recording for %r: %s", word, err)
+                return None
+
+            if not fetched or not fetched.get("Definition"):
+                return None
+
+            if reversed:
+                node, _ = fetched["Definition"][0]
+            else:
+                _, node = fetched["Definition"][0]
+
+            return node.audio
+
         await interaction.response.send_message(
             embed=embed,
             view=DefinitionView(
                 first_definition.audio,
                 btn_label=btn_label,
                 author_id=interaction.user.id,
+                pronunciations=self.pronunciations,
+                resolve_audio_url=resolve_audio_url,
             ),
         )
 
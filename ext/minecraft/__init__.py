@@ -5,7 +5,11 @@ from discord.ext import commands
 from discord import app_commands
 from mcstatus.status_response import JavaStatusPlayer
 
-from utils import to_cb, motd_to_ansi, convert_data_uri
+import asyncio
+
+from io import BytesIO
+
+from utils import logger, to_cb, clamp, sparkline
 from utils.views import ConfirmationView
 
 from .views import (
@@ -16,17 +20,56 @@ from .views import (
 )
 
 from .cache import (
+    MinecraftFaviconCache,
     MinecraftHeadCache,
-    MinecraftServer,
+    MinecraftRenderCache,
     MinecraftServerCache,
+    MinecraftStatusCache,
+)
+from .poller import MinecraftStatusPoller
+from .history import DAY, HistoryBucket, MinecraftStatusHistory
+from .query import MinecraftQueryClient
+from .rcon import (
+    MinecraftRconManager,
+    RconAuthenticationError,
+    RconError,
+    RconPlayerList,
 )
 
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Literal, Optional
 
 if TYPE_CHECKING:
+    from mcstatus.status_response import JavaStatusResponse
+
+    from .cache import MinecraftServer
     from utils import Estella, Interaction
 
 
+PLACEHOLDER_HEAD = "\N{BUST IN SILHOUETTE}"
+
+# players shown (with their heads) in the message, which keeps it well under 2000 characters;
+# complete lists longer than that are attached as a file.
+SHOWN_PLAYERS = 12
+
+HISTORY_PERIODS: dict[str, int] = {
+    "day": DAY,
+    "week": 7 * DAY,
+    "month": 30 * DAY,
+}
+HISTORY_WIDTH = 48  # characters per sparkline.
+
+
+async def _is_server_assigned(interaction: Interaction) -> bool:
+    cog: "Minecraft" = interaction.client.cogs[
+        "Minecraft"
+    ]  # pyright: ignore[reportAssignmentType]
+
+    if not await cog.minecraft_server_cache.get(interaction):
+        raise app_commands.CheckFailure("I'm not set to watch any contexts here.")
+
+    return True
+
+
 async def _is_server_online(interaction: Interaction) -> bool:
     assert interaction.channel
 
@@ -39,7 +82,8 @@ async def _is_server_online(interaction: Interaction) -> bool:
         raise app_commands.CheckFailure("I'm not set to watch any contexts here.")
 
     try:
-        await server.ping()
+        # shared with the command body through the status cache.
+        await cog.fetch_status(server)
     except Exception:
         raise app_commands.CheckFailure(
             "I can't seem to reach the server at this moment, please try again later."
@@ -53,12 +97,49 @@ class Minecraft(commands.Cog):
         self.bot = bot
         self.minecraft_server_cache = MinecraftServerCache(bot)
         self.minecraft_head_cache = MinecraftHeadCache(bot)
+        self.minecraft_status_cache = MinecraftStatusCache(ttl=5.0)
+        self.minecraft_favicon_cache = MinecraftFaviconCache()
+        self.minecraft_render_cache = MinecraftRenderCache()
+        self.minecraft_rcon = MinecraftRconManager(bot)
+        self.minecraft_query = MinecraftQueryClient()
+        self.minecraft_status_history = MinecraftStatusHistory(bot)
+        self.minecraft_status_poller = MinecraftStatusPoller(
+            self.minecraft_server_cache,
+            self.minecraft_status_cache,
+            history=self.minecraft_status_history,
+            interval=60,
+            concurrency=16,
+        )
 
     async def cog_load(self):
+        await self.minecraft_server_cache.populate()
         await self.minecraft_head_cache.populate()
+        await self.minecraft_rcon.populate()
+
+        self.minecraft_status_poller.start()
+        self.minecraft_status_history.start()
+        self.minecraft_head_cache.start_refreshing()
 
         return await super().cog_load()
 
+    async def cog_unload(self):
+        self.minecraft_status_poller.stop()
+        await self.minecraft_status_history.stop()
+        self.minecraft_head_cache.stop_refreshing()
+        self.minecraft_head_cache.flush_usage()  # written by the bot's write queue.
+        self.minecraft_rcon.close()
+        self.minecraft_query.close()
+
+        return await super().cog_unload()
+
+    async def fetch_status(self, server: MinecraftServer) -> JavaStatusResponse:
+        # answered instantly from the background poll, when there's a recent one.
+        snapshot = self.minecraft_status_poller.snapshot(server.ip)
+        if snapshot and snapshot.status:
+            return snapshot.status
+
+        return await self.minecraft_status_cache.get(server)
+
     async def cog_app_command_error(  # pyright: ignore[reportIncompatibleMethodOverride]
         self,
         interaction: Interaction,
@@ -78,6 +159,37 @@ class Minecraft(commands.Cog):
 
         raise error
 
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def mcstats(self, ctx: commands.Context[Estella]):
+        """
+        Shows internal cache statistics of the `Minecraft` cog.
+        """
+
+        status_cache = self.minecraft_status_cache
+        poller = self.minecraft_status_poller
+        head_cache = self.minecraft_head_cache
+        render_cache = self.minecraft_render_cache
+
+        online = sum(1 for s in poller.snapshots.values() if s.status)
+
+        await ctx.send(
+            f"**Status cache** (ttl: `{status_cache.ttl}s`): "
+            f"`{status_cache.hits}` hits, `{status_cache.misses}` misses, "
+            f"`{status_cache.coalesced}` coalesced\n"
+            f"**Poller** (interval: `{poller.interval}s`): "
+            f"`{online}`/`{len(poller.snapshots)}` online, "
+            f"`{poller.queue_depth}` queued\n"
+            f"**Render cache**: `{render_cache.hits}` hits, `{render_cache.misses}` misses\n"
+            f"**RCON**: `{self.minecraft_rcon.pools}` pools\n"
+            f"**Query**: `{self.minecraft_query.in_flight}` in flight\n"
+            f"**Write queue**: `{len(self.bot.write_queue)}` pending, "
+            f"`{self.bot.write_queue.coalesced}` coalesced, `{self.bot.write_queue.flushes}` flushes\n"
+            f"**Player heads**: `{head_cache.occupancy}`/`{head_cache.capacity}` emojis, "
+            f"`{head_cache.refresh_queue_depth}` queued for refresh "
+            f"({', '.join(f'{k}: `{v}`' for k, v in head_cache.refresh_outcomes.items()) or 'none yet'})"
+        )
+
     server = app_commands.Group(
         name="server",
         description="Commands related to any minecraft server that I watch.",
@@ -127,16 +239,10 @@ class Minecraft(commands.Cog):
                 view=None,
             )
 
-    @server.command(description="Assign a Minecraft Server to a channnel.")
-    @app_commands.describe(minecraft_server_ip="The Minecraft Server IP.")
-    async def assign(
-        self,
-        interaction: Interaction,
-        minecraft_server_ip: str,
-    ):
+    async def _ensure_can_manage(self, interaction: Interaction):
         assert interaction.channel
 
-        owner = await interaction.client.is_owner(interaction.user)
+        owner = interaction.client.is_owner_id(interaction.user.id)
 
         if isinstance(interaction.channel, discord.GroupChannel):
             if not (interaction.user == interaction.channel.owner or owner):
@@ -164,10 +270,21 @@ class Minecraft(commands.Cog):
 
                 raise app_commands.CheckFailure(error_message)
 
+    @server.command(description="Assign a Minecraft Server to a channnel.")
+    @app_commands.describe(minecraft_server_ip="The Minecraft Server IP.")
+    async def assign(
+        self,
+        interaction: Interaction,
+        minecraft_server_ip: str,
+    ):
+        assert interaction.channel
+
+        await self._ensure_can_manage(interaction)
+
         await interaction.response.defer()
 
         try:
-            server = MinecraftServer(minecraft_server_ip)
+            server = await self.minecraft_server_cache.server(minecraft_server_ip)
 
             await server.ping()
         except Exception:
@@ -226,53 +343,112 @@ class Minecraft(commands.Cog):
     @app_commands.check(_is_server_online)
     async def ping(self, interaction: Interaction):
         server = await self.minecraft_server_cache.fetch(interaction)
-        latency = await server.ping()
 
-        await interaction.response.send_message(f"Pong! **{latency:.2f}ms**")
+        snapshot = self.minecraft_status_poller.snapshot(server.ip)
+        if snapshot and snapshot.latency is not None:
+            latency = snapshot.latency
+        else:
+            latency = await server.ping()
+
+        p50, p95, p99 = server.latency.percentiles(50, 95, 99)
+        assert p50 and p95 and p99  # there's at least the sample above.
+
+        await interaction.response.send_message(
+            f"Pong! **{latency:.2f}ms**\n"
+            f"-# p50 `{p50:.2f}ms`, p95 `{p95:.2f}ms`, p99 `{p99:.2f}ms`, "
+            f"{server.latency.loss_rate:.1%} loss over the last {len(server.latency)} pings."
+        )
 
     @server.command(description="Views the information of the server.")
     @app_commands.check(_is_server_online)
     async def info(self, interaction: Interaction):
+        # asking query for the server's software can take a few round trips.
+        await interaction.response.defer()
+
         server = await self.minecraft_server_cache.fetch(interaction)
-        status = await server.status()
+        status = await self.fetch_status(server)
 
-        embed = (
-            discord.Embed(
-                title="Server Information",
-                description=to_cb(motd_to_ansi(status.motd.parsed), lang="ansi"),
-            )
-            .add_field(
-                name="Players",
-                value=f"{status.players.online}/{status.players.max}",
-            )
-            .add_field(
-                name="Server IP",
-                value=f"**`{server.ip}`**",
-            )
-            .add_field(
-                name="Version",
-                value=status.version.name,
-            )
-            .set_image(url="https://i.imgur.com/IfBmnOp.png")
+        favicon = (
+            self.minecraft_favicon_cache.get(status.favicon) if status.favicon else None
         )
 
-        favicon = None
-        if status.favicon:
-            favicon = convert_data_uri(status.favicon)
-            embed.set_thumbnail(url=f"attachment://favicon.{favicon[1]}")
+        software = None
+        if query := await self.minecraft_query.query(server):
+            software = query.software.brand
+            if query.software.plugins:
+                software += f" ({', '.join(query.software.plugins)})"
+
+        render_cache = self.minecraft_render_cache
+        fingerprint = render_cache.fingerprint(status, favicon, software=software)
+
+        embed = render_cache.get(server.ip, fingerprint)
+        if not embed:
+            embed = (
+                discord.Embed(
+                    title="Server Information",
+                    description=to_cb(render_cache.motd(status.motd), lang="ansi"),
+                )
+                .add_field(
+                    name="Players",
+                    value=f"{status.players.online}/{status.players.max}",
+                )
+                .add_field(
+                    name="Server IP",
+                    value=f"**`{server.ip}`**",
+                )
+                .add_field(
+                    name="Version",
+                    value=status.version.name,
+                )
+                .set_image(url="https://i.imgur.com/IfBmnOp.png")
+            )
 
-        await interaction.response.send_message(
+            if software:
+                embed.add_field(name="Software", value=clamp(software, length=1024))
+
+            render_cache.set(server.ip, fingerprint, embed)
+
+        file = discord.utils.MISSING
+
+        # the thumbnail depends on whether the favicon was uploaded before, so it's never cached.
+        if favicon:
+            url = self.minecraft_favicon_cache.url(favicon)
+            if url:  # already on discord's CDN, no need to upload it again.
+                embed.set_thumbnail(url=url)
+            else:
+                file = discord.File(BytesIO(favicon.data), filename=favicon.filename)
+                embed.set_thumbnail(url=f"attachment://{favicon.filename}")
+
+        message = await interaction.edit_original_response(
             embed=embed,
-            file=(
-                discord.File(favicon[0], filename=f"favicon.{favicon[1]}")
-                if favicon
-                else discord.utils.MISSING
-            ),
+            attachments=[file] if file else discord.utils.MISSING,
         )
 
-    async def _format_player(self, player: JavaStatusPlayer) -> str:
-        head = await self.minecraft_head_cache.get(player, create=True)
-        return f"{head} **{player.name}**"
+        if favicon and file and message.attachments:
+            self.minecraft_favicon_cache.set_url(favicon, message.attachments[0].url)
+
+    async def _rcon_players(self, server: MinecraftServer) -> Optional[RconPlayerList]:
+        if not self.minecraft_rcon.has_credentials(server):
+            return None
+
+        try:
+            listing = await self.minecraft_rcon.players(server)
+        except (RconError, asyncio.TimeoutError) as err:
+            logger.debug("Falling back to the player sample for %s: %s", server.ip, err)
+            return None
+
+        # older servers don't support `list uuids`, which the heads rely on.
+        if listing and (listing.players or listing.online == 0):
+            return listing
+
+        return None
+
+    def _format_player(
+        self,
+        player: JavaStatusPlayer,
+        head: Optional[discord.PartialEmoji],
+    ) -> str:
+        return f"{head or PLACEHOLDER_HEAD} **{player.name}**"
 
     @server.command(description="List online players.")
     @app_commands.check(_is_server_online)
@@ -280,23 +456,51 @@ class Minecraft(commands.Cog):
         await interaction.response.defer()
 
         server = await self.minecraft_server_cache.fetch(interaction)
-        status = await server.status()
+        status = await self.fetch_status(server)
 
-        if not status.players.sample:
+        online, max_players, sample = (
+            status.players.online,
+            status.players.max,
+            status.players.sample,
+        )
+
+        # servers we administer give us the complete list, rather than the (12 player) sample.
+        listing = await self._rcon_players(server)
+        if listing:
+            online, max_players, sample = listing
+        elif query := await self.minecraft_query.query(server):
+            # query only gives us names, the uuids (for the heads) come from the sample.
+            uuids = {player.name: player.uuid for player in sample or []}
+
+            online, max_players = query.players.online, query.players.max
+            sample = [
+                JavaStatusPlayer(name=name, id=uuids.get(name, ""))
+                for name in query.players.names
+            ]
+
+        if not sample:
             await interaction.edit_original_response(
                 content="I don't see anyone online at the moment."
             )
 
             return
 
+        named_players = [
+            player for player in sample if player.name != "Anonymous Player"
+        ]
+        shown_players = named_players[:SHOWN_PLAYERS]
+
+        # only the heads that are shown, a complete list would go through the emoji capacity.
+        # heads that take too long are filled in with a placeholder, and finish in the background.
+        heads = await self.minecraft_head_cache.get_many(shown_players, timeout=2.5)
+
         players_list = [
-            await self._format_player(player)
-            for player in status.players.sample
-            if player.name != "Anonymous Player"
+            self._format_player(player, heads[player.uuid]) for player in shown_players
         ]
 
-        annons = len(status.players.sample) - len(players_list)  # rest are annons
-        plularity = "players" if annons > 1 else "player"
+        annons = len(sample) - len(named_players)  # rest are annons
+        remaining = len(sample) - len(players_list)
+        plularity = "players" if remaining > 1 else "player"
 
         # when all the players are "Anonymous Player"s
         if not players_list and annons > 0:
@@ -304,17 +508,118 @@ class Minecraft(commands.Cog):
         else:
             players = ", ".join(players_list)
 
-            if annons > 0:
-                players += f" and {annons} more {plularity}"
+            if remaining > 0:
+                players += f" and {remaining} more {plularity}"
 
-        result = (
-            f"**{status.players.online}**/**{status.players.max}** online: {players}."
-        )
+        result = f"**{online}**/**{max_players}** online: {players}."
 
         if annons > 0:
             result += "\n-# Can't see your name or others? [`Learn More`](<https://minecraft.wiki/w/Java_Edition_21w44a#General>)"
 
-        await interaction.edit_original_response(content=result)
+        file = discord.utils.MISSING
+        if len(named_players) > len(shown_players):
+            names = "\n".join(player.name for player in named_players)
+            file = discord.File(BytesIO(names.encode()), filename="players.txt")
+
+        await interaction.edit_original_response(
+            content=result,
+            attachments=[file] if file else discord.utils.MISSING,
+        )
+
+    @server.command(
+        description="Shows the player count and latency history of the server."
+    )
+    @app_commands.describe(period="How far back to look.")
+    @app_commands.check(_is_server_assigned)
+    async def history(
+        self,
+        interaction: Interaction,
+        period: Literal["day", "week", "month"] = "day",
+    ):
+        server = await self.minecraft_server_cache.fetch(interaction)
+        buckets = await self.minecraft_status_history.fetch(
+            server.ip,
+            period=HISTORY_PERIODS[period],
+        )
+
+        if not buckets:
+            return await interaction.response.send_message(
+                "I haven't collected any history for this server yet, check back later.",
+                ephemeral=True,
+            )
+
+        # merged down to a fixed amount of columns, so every period fits on one line.
+        size = max(len(buckets) // HISTORY_WIDTH, 1)
+        columns: list[HistoryBucket] = []
+        for i in range(0, len(buckets), size):
+            column = buckets[i]
+            for bucket in buckets[i + 1 : i + size]:
+                column = column.merge(bucket)
+
+            columns.append(column)
+
+        total = columns[0]
+        for column in columns[1:]:
+            total = total.merge(column)
+
+        players = f"peak **{total.players_peak}**"
+        if total.players is not None:
+            players += f", avg **{total.players:.1f}**"
+
+        latency = (
+            f"avg **{total.latency:.2f}ms**" if total.latency is not None else "no data"
+        )
+
+        await interaction.response.send_message(
+            f"History of **`{server.ip}`** over the last {period}:\n"
+            f"Players ({players}): `{sparkline([c.players for c in columns])}`\n"
+            f"Latency ({latency}): `{sparkline([c.latency for c in columns])}`\n"
+            f"Uptime: **{total.online / total.samples:.1%}**"
+        )
+
+    @server.command(description="Use RCON to get the full player list of the server.")
+    @app_commands.describe(
+        port="The RCON port of the server.",
+        password="The RCON password of the server.",
+    )
+    @app_commands.check(_is_server_assigned)
+    async def rcon(
+        self,
+        interaction: Interaction,
+        port: app_commands.Range[int, 1, 65535],
+        password: str,
+    ):
+        await self._ensure_can_manage(interaction)
+
+        await interaction.response.defer(ephemeral=True)
+
+        server = await self.minecraft_server_cache.fetch(interaction)
+
+        try:
+            await self.minecraft_rcon.verify(server, port=port, password=password)
+        except RconAuthenticationError:
+            return await interaction.edit_original_response(
+                content="That RCON password doesn't seem to be correct."
+            )
+        except Exception:
+            return await interaction.edit_original_response(
+                content=f"I can't seem to reach RCON on **`{server.address.host}:{port}`**."
+            )
+
+        await self.minecraft_rcon.set_credentials(
+            server,
+            port=port,
+            password=password,
+            assigned_by=interaction.user.id,
+        )
+
+        await self.minecraft_server_cache.set_server_type(
+            server.ip, MinecraftServerType.RCON
+        )
+
+        await interaction.edit_original_response(
+            content=f"I'll use RCON to list the players of **`{server.ip}`** from now on."
+        )
 
 
 async def setup(bot: Estella):
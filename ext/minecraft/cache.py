@@ -2,24 +2,36 @@ from __future__ import annotations
 
 import discord
 
+import json
+import math
+import time
 import asyncio
+import itertools
 import datetime
 import hashlib
 
 from mcstatus import JavaServer
+from mcstatus.pinger import AsyncServerPinger
+from mcstatus.protocol.connection import TCPAsyncSocketConnection
 from mcstatus.status_response import JavaStatusResponse
 
 from enum import IntEnum
+from urllib.parse import parse_qs, urlparse
+from collections import Counter, OrderedDict, deque
 
-from utils import logger, Interaction
+from utils import logger, convert_data_uri, motd_to_ansi, Interaction
 
-from typing import TYPE_CHECKING, Callable, Optional
+from .resolver import MinecraftResolver
+
+from typing import TYPE_CHECKING, Callable, NamedTuple, Optional
 
 if TYPE_CHECKING:
     from typing import Optional
 
     from utils import Estella
 
+    from mcstatus.address import Address
+    from mcstatus.motd import Motd
     from mcstatus.status_response import JavaStatusPlayer
 
 
@@ -69,17 +81,76 @@ HIERARCHY: list[tuple[ChannelType, IDExtractor]] = [
 ]
 
 
+class LatencyHistogram:
+    """
+    A ring buffer of the most recent ping samples, where `None` is a lost ping.
+    """
+
+    def __init__(self, *, size: int = 256):
+        self._samples: deque[Optional[float]] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, latency: Optional[float]):
+        self._samples.append(latency)
+
+    @property
+    def loss_rate(self) -> float:
+        if not self._samples:
+            return 0.0
+
+        return self._samples.count(None) / len(self._samples)
+
+    def percentiles(self, *percentiles: float) -> list[Optional[float]]:
+        samples = sorted(s for s in self._samples if s is not None)
+        if not samples:
+            return [None] * len(percentiles)
+
+        # nearest-rank, so every value is an actual sample.
+        return [
+            samples[max(math.ceil(p / 100 * len(samples)) - 1, 0)] for p in percentiles
+        ]
+
+
 class MinecraftServer:
-    def __init__(self, ip: str):
+    def __init__(self, ip: str, address: Address):
         self.ip = ip
-        self.__server = JavaServer.lookup(ip)
+        self.__server = JavaServer(address.host, address.port)
+
+        self.latency = LatencyHistogram()
+
+    @property
+    def address(self) -> Address:
+        return self.__server.address
+
+    @address.setter
+    def address(self, address: Address):
+        if address != self.__server.address:
+            self.__server = JavaServer(address.host, address.port)
 
     async def ping(self) -> float:
-        before = discord.utils.utcnow().timestamp()
-        await self.status()
-        after = discord.utils.utcnow().timestamp()
+        """
+        Measures the round trip of a single ping packet, in milliseconds.
+        """
+
+        address = self.__server.address
+
+        try:
+            async with TCPAsyncSocketConnection(
+                address, self.__server.timeout
+            ) as connection:
+                pinger = AsyncServerPinger(connection, address=address)
+                pinger.handshake()
+
+                # not retried, as a retry would hide the very loss we're measuring.
+                latency = await pinger.test_ping()  # timed with a monotonic clock.
+        except Exception:
+            self.latency.record(None)
+            raise
 
-        return (after - before) / 1000
+        self.latency.record(latency)
+        return latency
 
     async def status(self) -> JavaStatusResponse:
         return (
@@ -87,9 +158,268 @@ class MinecraftServer:
         )
 
 
+class MinecraftStatusCache:
+    def __init__(self, *, ttl: float = 5.0):
+        self.ttl = ttl
+
+        self._cache: dict[str, tuple[float, JavaStatusResponse]] = {}
+        self._pending: dict[str, asyncio.Task[JavaStatusResponse]] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get(self, server: MinecraftServer) -> JavaStatusResponse:
+        cached = self._cache.get(server.ip)
+        if cached and time.monotonic() - cached[0] < self.ttl:
+            self.hits += 1
+            return cached[1]
+
+        return await self.refresh(server)
+
+    async def refresh(self, server: MinecraftServer) -> JavaStatusResponse:
+        task = self._pending.get(server.ip)
+        if task:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+
+            task = asyncio.create_task(self._fetch(server))
+            self._pending[server.ip] = task
+
+        # shielded, so one caller giving up doesn't cancel the request for everyone else.
+        return await asyncio.shield(task)
+
+    async def _fetch(self, server: MinecraftServer) -> JavaStatusResponse:
+        try:
+            status = await server.status()
+            self._cache[server.ip] = (time.monotonic(), status)
+
+            return status
+        finally:
+            del self._pending[server.ip]
+
+    def invalidate(self, server_ip: str):
+        self._cache.pop(server_ip, None)
+
+
+class Favicon(NamedTuple):
+    hash: str
+    data: bytes
+    ext: str
+
+    @property
+    def filename(self) -> str:
+        return f"favicon.{self.ext}"
+
+
+class MinecraftFaviconCache:
+    """
+    Decoded favicons keyed by a hash of their data uri, along with the CDN url they were last
+    uploaded to, so unchanged favicons aren't decoded or uploaded again.
+    """
+
+    def __init__(self, *, size: int = 256):
+        self.size = size
+
+        self._cache: OrderedDict[str, Favicon] = OrderedDict()
+        self._urls: dict[str, str] = {}
+
+    def get(self, data_uri: str) -> Favicon:
+        hash_ = hashlib.sha1(data_uri.encode()).hexdigest()
+
+        favicon = self._cache.get(hash_)
+        if favicon:
+            self._cache.move_to_end(hash_)
+            return favicon
+
+        data, ext = convert_data_uri(data_uri)
+        favicon = self._cache[hash_] = Favicon(hash_, data.getvalue(), ext)
+
+        if len(self._cache) > self.size:
+            evicted, _ = self._cache.popitem(last=False)
+            self._urls.pop(evicted, None)
+
+        return favicon
+
+    def url(self, favicon: Favicon) -> Optional[str]:
+        url = self._urls.get(favicon.hash)
+        if not url:
+            return None
+
+        # attachment urls are signed, and stop working once they expire.
+        expires_at = parse_qs(urlparse(url).query).get("ex")
+        if expires_at and int(expires_at[0], 16) - 60 < time.time():
+            del self._urls[favicon.hash]
+            return None
+
+        return url
+
+    def set_url(self, favicon: Favicon, url: str):
+        if favicon.hash in self._cache:
+            self._urls[favicon.hash] = url
+
+
+class MinecraftRenderCache:
+    """
+    Prebuilt `/server info` embeds keyed by server ip and a fingerprint of the status they were
+    built from, along with the ansi rendering of each raw MOTD.
+    """
+
+    def __init__(self, *, size: int = 512):
+        self.size = size
+
+        self._embeds: OrderedDict[tuple[str, str], discord.Embed] = OrderedDict()
+        self._motds: OrderedDict[str, str] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _motd_key(motd: Motd) -> str:
+        raw = (
+            motd.raw
+            if isinstance(motd.raw, str)
+            else json.dumps(motd.raw, sort_keys=True)
+        )
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def fingerprint(
+        self,
+        status: JavaStatusResponse,
+        favicon: Optional[Favicon],
+        *,
+        software: Optional[str] = None,
+    ) -> str:
+        return "\0".join(
+            (
+                self._motd_key(status.motd),
+                status.version.name,
+                str(status.players.online),
+                str(status.players.max),
+                favicon.hash if favicon else "",
+                software or "",
+            )
+        )
+
+    def motd(self, motd: Motd) -> str:
+        key = self._motd_key(motd)
+
+        ansi = self._motds.get(key)
+        if ansi is None:
+            ansi = self._motds[key] = motd_to_ansi(motd.parsed)
+
+            if len(self._motds) > self.size:
+                self._motds.popitem(last=False)
+        else:
+            self._motds.move_to_end(key)
+
+        return ansi
+
+    def get(self, server_ip: str, fingerprint: str) -> Optional[discord.Embed]:
+        embed = self._embeds.get((server_ip, fingerprint))
+        if not embed:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._embeds.move_to_end((server_ip, fingerprint))
+
+        # copied, so whoever sends it can't change the cached one.
+        return embed.copy()
+
+    def set(self, server_ip: str, fingerprint: str, embed: discord.Embed):
+        self._embeds[(server_ip, fingerprint)] = embed.copy()
+
+        if len(self._embeds) > self.size:
+            self._embeds.popitem(last=False)
+
+
+AssignmentKey = tuple[ChannelType, int, Optional[int]]
+
+
 class MinecraftServerCache:
-    def __init__(self, bot: Estella):
+    def __init__(self, bot: Estella, *, size: int = 128):
         self.bot = bot
+        self.size = size
+
+        # mirrors `minecraft_servers`, so resolving the hierarchy never touches the database.
+        self._index: dict[AssignmentKey, str] = {}
+        self._keys: dict[int, AssignmentKey] = {}  # assigned_to -> key
+        self._assigned: Counter[str] = Counter()  # ip -> amount of assignments
+
+        self.resolver = MinecraftResolver()
+
+        # servers of assigned ips are kept for as long as they're assigned, anything else that's
+        # typed in (e.g. `/server assign` attempts) only gets a spot in a bounded LRU.
+        self._servers: dict[str, MinecraftServer] = {}
+        self._transient: OrderedDict[str, MinecraftServer] = OrderedDict()
+
+    async def populate(self):
+        async with self.bot.pool.acquire() as conn:
+            rows = await conn.fetchall(
+                """
+                SELECT assigned_to, parent_id, channel_type, ip
+                    FROM minecraft_servers;
+            """
+            )
+
+        self._index.clear()
+        self._keys.clear()
+        self._assigned.clear()
+
+        for row in rows:
+            self._set(
+                row["ip"],
+                channel_id=row["assigned_to"],
+                channel_type=ChannelType(row["channel_type"]),
+                parent_id=row["parent_id"],
+            )
+
+        logger.debug("Indexed %s minecraft server assignments.", len(self._index))
+
+    def _set(
+        self,
+        server_ip: str,
+        *,
+        channel_id: int,
+        channel_type: ChannelType,
+        parent_id: Optional[int],
+    ):
+        # `assigned_to` is the primary key, so an update can move a row to a new key.
+        old_key = self._keys.pop(channel_id, None)
+        if old_key is not None:
+            old_ip = self._index.pop(old_key, None)
+            if old_ip is not None:
+                self._unassign(old_ip)
+
+        key = (channel_type, channel_id, parent_id)
+
+        self._index[key] = server_ip
+        self._keys[channel_id] = key
+        self._assigned[server_ip] += 1
+
+    def _unassign(self, server_ip: str):
+        self._assigned[server_ip] -= 1
+        if self._assigned[server_ip] > 0:
+            return
+
+        del self._assigned[server_ip]
+
+        server = self._servers.pop(server_ip, None)
+        if server:
+            self._remember(server)
+
+    def _remember(self, server: MinecraftServer):
+        self._transient[server.ip] = server
+        self._transient.move_to_end(server.ip)
+
+        if len(self._transient) > self.size:
+            evicted, _ = self._transient.popitem(last=False)
+            self.resolver.forget(evicted)
+
+    def server_ips(self) -> set[str]:
+        return set(self._index.values())
 
     async def is_any_server_assigned(
         self,
@@ -98,22 +428,7 @@ class MinecraftServerCache:
         *,
         parent_channel_id: Optional[int] = None,
     ) -> bool:
-        async with self.bot.pool.acquire() as conn:
-            assigned = await conn.fetchone(
-                """
-                SELECT EXISTS(
-                    SELECT 1 FROM minecraft_servers 
-                        WHERE assigned_to = $1
-                        AND   channel_type = $2
-                        AND   parent_id IS $3
-                )
-            """,
-                channel_id,
-                channel_type.value,
-                parent_channel_id,
-            )
-
-        return bool(assigned[0])
+        return (channel_type, channel_id, parent_channel_id) in self._index
 
     async def assign_or_update(
         self,
@@ -125,64 +440,90 @@ class MinecraftServerCache:
         parent_id: Optional[int] = None,
         minecraft_server_type: MinecraftServerType = MinecraftServerType.IP,
     ):
-        async with self.bot.pool.acquire() as conn:
-            await conn.execute(
-                """
-                INSERT INTO minecraft_servers (
-                    assigned_to, parent_id, assigned_by, 
-                    channel_type, minecraft_server_type, ip
-                )
-                    VALUES (
-                        $1, $2, $3, 
-                        $4, $5, $6
-                    )
-                ON CONFLICT (assigned_to) 
-                    DO UPDATE SET
-                        parent_id = $2, 
-                        assigned_by = $3,
-                        channel_type = $4,
-                        minecraft_server_type = $5, 
-                        ip = $6;
-            """,
-                channel_id,
-                parent_id,
-                assigned_by,
-                channel_type.value,
-                minecraft_server_type.value,
-                server_ip,
+        self.bot.write_queue.enqueue(
+            """
+            INSERT INTO minecraft_servers (
+                assigned_to, parent_id, assigned_by, 
+                channel_type, minecraft_server_type, ip
             )
+                VALUES (
+                    $1, $2, $3, 
+                    $4, $5, $6
+                )
+            ON CONFLICT (assigned_to) 
+                DO UPDATE SET
+                    parent_id = $2, 
+                    assigned_by = $3,
+                    channel_type = $4,
+                    minecraft_server_type = $5, 
+                    ip = $6;
+        """,
+            channel_id,
+            parent_id,
+            assigned_by,
+            channel_type.value,
+            minecraft_server_type.value,
+            server_ip,
+            key=channel_id,
+        )
+
+        self._set(
+            server_ip,
+            channel_id=channel_id,
+            channel_type=channel_type,
+            parent_id=parent_id,
+        )
+
+    async def set_server_type(
+        self,
+        server_ip: str,
+        minecraft_server_type: MinecraftServerType,
+    ):
+        self.bot.write_queue.enqueue(
+            """
+            UPDATE minecraft_servers
+                SET minecraft_server_type = $1
+            WHERE ip = $2;
+        """,
+            minecraft_server_type.value,
+            server_ip,
+            key=server_ip,
+        )
 
     async def get(
         self,
         interaction: Interaction,
     ) -> Optional[MinecraftServer]:
-        applicable_hierarchy = [
-            (channel_type, extracted_ids)
-            for channel_type, id_extractor in HIERARCHY
-            if (extracted_ids := id_extractor(interaction)) is not None
-        ]
+        for channel_type, id_extractor in HIERARCHY:
+            extracted_ids = id_extractor(interaction)
+            if extracted_ids is None:
+                continue
 
-        async with self.bot.pool.acquire() as conn:
-            for channel_type, (channel_id, parent_channel_id) in applicable_hierarchy:
-                server_ip = await conn.fetchone(
-                    """
-                    SELECT ip
-                        FROM minecraft_servers
-                    WHERE 
-                        assigned_to = $1
-                    AND channel_type = $2
-                    AND parent_id IS $3;
-                """,
-                    channel_id,
-                    channel_type.value,
-                    parent_channel_id,
-                )
+            channel_id, parent_channel_id = extracted_ids
 
-                if server_ip:
-                    return MinecraftServer(server_ip[0])
+            server_ip = self._index.get((channel_type, channel_id, parent_channel_id))
+            if server_ip:
+                return await self.server(server_ip)
 
         return None
 
+    async def server(self, server_ip: str) -> MinecraftServer:
+        address = await self.resolver.resolve(server_ip)
+
+        server = self._servers.get(server_ip) or self._transient.get(server_ip)
+        if server:
+            server.address = address  # in case the record changed since.
+        else:
+            server = MinecraftServer(server_ip, address)
+
+        if server_ip in self._assigned:
+            self._transient.pop(server_ip, None)
+            self._servers[server_ip] = server
+        else:
+            self._remember(server)
+
+        return server
+
     async def fetch(
         self,
         interaction: Interaction,
@@ -194,11 +535,75 @@ class MinecraftServerCache:
         return server
 
 
+class HeadImage(NamedTuple):
+    data: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+class HeadInfo(NamedTuple):
+    emoji_hash: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    checked_at: datetime.datetime
+
+
 class MinecraftHeadCache:
-    def __init__(self, bot: Estella):
+    def __init__(
+        self,
+        bot: Estella,
+        *,
+        concurrency: int = 4,
+        capacity: int = 1900,
+        eviction_batch: int = 50,
+        usage_flush_interval: float = 60,
+        refresh_interval: datetime.timedelta = datetime.timedelta(minutes=10),
+        refresh_concurrency: int = 2,
+    ):
         self.bot = bot
-        self._cache: dict[str, discord.Emoji] = {}
-        self._lock = asyncio.Lock()
+
+        # uuid -> emoji, in least to most recently used order.
+        self._cache: OrderedDict[str, discord.PartialEmoji] = OrderedDict()
+
+        # in-flight creations per player, which doubles as a per-player lock.
+        self._pending: dict[str, asyncio.Task[discord.PartialEmoji]] = {}
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+        self._reconcile_task: Optional[asyncio.Task[None]] = None
+
+        # application emojis are capped (at 2000), so some headroom is left for everything else.
+        self.capacity = capacity
+        self.eviction_batch = eviction_batch
+        self._reserved = 0  # slots taken by heads that are being created.
+        self._eviction_lock = asyncio.Lock()
+
+        # last used timestamps are written in batches, rather than on every use.
+        self.usage_flush_interval = usage_flush_interval
+        self._used: dict[str, datetime.datetime] = {}
+        self._flush_task: Optional[asyncio.Task[None]] = None
+
+        self._info: dict[str, HeadInfo] = {}
+
+        self.refresh_interval = refresh_interval
+        self.refresh_concurrency = refresh_concurrency
+        self.refresh_outcomes: Counter[str] = Counter()
+        self._refresh_queue: asyncio.Queue[JavaStatusPlayer] = asyncio.Queue()
+        self._queued: set[str] = set()
+        self._refresh_workers: list[asyncio.Task[None]] = []
+
+    @property
+    def occupancy(self) -> int:
+        return len(self._cache) + self._reserved
+
+    @property
+    def refresh_queue_depth(self) -> int:
+        return self._refresh_queue.qsize()
+
+    @staticmethod
+    def emoji_name(uuid: str) -> str:
+        # derived from the uuid rather than the player name, as names can change hands.
+        # (emoji names are capped at 32 characters)
+        return f"{uuid.replace('-', '')[:27]}_head"
 
     async def get(
         self,
@@ -206,138 +611,471 @@ class MinecraftHeadCache:
         *,
         update: Optional[bool] = False,
         create: Optional[bool] = False,
-    ) -> discord.Emoji:
-        name = player.name.lower().replace(".", "_")
-        
-        emoji = self._cache.get(name)
+    ) -> discord.PartialEmoji:
+        emoji = self._cache.get(player.uuid)
         if emoji:
+            self._touch(player.uuid)
+
             if update:
-                await self.bot.loop.create_task(
-                    self._validate_and_update(player)
-                )  # update in the background
+                self.enqueue_refresh(player)
 
             return emoji
 
         if not create:
-            raise ValueError(f"{name}'s player head not found.")
+            raise ValueError(f"{player.name}'s player head not found.")
+
+        return await self.create(player)
+
+    async def get_many(
+        self,
+        players: list[JavaStatusPlayer],
+        *,
+        timeout: float = 2.5,
+    ) -> dict[str, Optional[discord.PartialEmoji]]:
+        """
+        Resolves the heads of every player concurrently, heads that aren't ready within `timeout`
+        are `None` and keep being created in the background.
+        """
+
+        heads: dict[str, Optional[discord.PartialEmoji]] = {}
+        pending: dict[str, asyncio.Task[discord.PartialEmoji]] = {}
 
-        await self.create(player)
-        return await self.get(player)
+        for player in players:
+            if not player.uuid:  # there's no way to get a head without it.
+                heads[player.uuid] = None
+                continue
+
+            emoji = self._cache.get(player.uuid)
+            if emoji:
+                self._touch(player.uuid)
+                self.enqueue_refresh(player)
+
+                heads[player.uuid] = emoji
+            else:
+                pending[player.uuid] = self._create(player)
+
+        if pending:
+            await asyncio.wait(pending.values(), timeout=timeout)
+
+        for uuid, task in pending.items():
+            if task.done() and not task.cancelled() and not task.exception():
+                heads[uuid] = task.result()
+            else:
+                heads[uuid] = None
+
+        return heads
 
     async def populate(self):
+        async with self.bot.pool.acquire() as conn:
+            rows = await conn.fetchall(
+                """
+                SELECT
+                    uuid, emoji_id, emoji_name, emoji_hash,
+                    etag, last_modified, last_updated_at
+                FROM minecraft_heads
+                WHERE emoji_id IS NOT NULL
+                ORDER BY COALESCE(last_used_at, created_at);
+            """
+            )
+
+        for row in rows:
+            self._cache[row["uuid"]] = discord.PartialEmoji(
+                name=row["emoji_name"],
+                id=row["emoji_id"],
+            )
+
+            self._info[row["uuid"]] = HeadInfo(
+                emoji_hash=row["emoji_hash"],
+                etag=row["etag"],
+                last_modified=row["last_modified"],
+                checked_at=datetime.datetime.fromisoformat(row["last_updated_at"]),
+            )
+
+        logger.debug("Loaded %s player heads.", len(self._cache))
+
+        # checking against discord is only for housekeeping, it doesn't have to block startup.
+        self._reconcile_task = self.bot.loop.create_task(self.reconcile())
+        self._reconcile_task.add_done_callback(self._on_reconcile_done)
+
+    def _on_reconcile_done(self, task: asyncio.Task[None]):
+        if not task.cancelled() and task.exception():
+            logger.error("Failed to reconcile the player heads: %s", task.exception())
+
+    def _touch(self, uuid: str):
+        self._cache.move_to_end(uuid)
+        self._used[uuid] = datetime.datetime.now()
+
+        if not self._flush_task or self._flush_task.done():
+            self._flush_task = self.bot.loop.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(self.usage_flush_interval)
+        self.flush_usage()
+
+    def flush_usage(self):
+        if not self._used:
+            return
+
+        used, self._used = self._used, {}
+
+        for uuid, last_used_at in used.items():
+            self.bot.write_queue.enqueue(
+                """
+                UPDATE minecraft_heads
+                    SET last_used_at = $1
+                WHERE uuid = $2;
+            """,
+                last_used_at,
+                uuid,
+                key=uuid,
+            )
+
+    async def _reserve(self):
+        # serialized, so concurrent creations can't each see room for one more.
+        async with self._eviction_lock:
+            victims = (
+                self._pick_victims(self.eviction_batch)
+                if self.occupancy >= self.capacity
+                else []
+            )
+
+            self._reserved += 1
+
+        # their slots are already free, so other creations don't wait on discord deleting them.
+        await self._delete_victims(victims)
+
+    async def evict(self, amount: int):
+        async with self._eviction_lock:
+            victims = self._pick_victims(amount)
+
+        await self._delete_victims(victims)
+
+    def _pick_victims(self, amount: int) -> list[tuple[str, discord.PartialEmoji]]:
+        victims = [
+            (uuid, self._cache.pop(uuid))
+            for uuid in list(itertools.islice(self._cache, amount))
+        ]
+
+        for uuid, _ in victims:
+            self._used.pop(uuid, None)
+            self._info.pop(uuid, None)
+
+        if victims:
+            logger.debug("Evicting %s least recently used player heads.", len(victims))
+
+        return victims
+
+    async def _delete_victims(self, victims: list[tuple[str, discord.PartialEmoji]]):
+        for uuid, emoji in victims:
+            try:
+                assert emoji.id and self.bot.application_id
+                await self.bot.http.delete_application_emoji(
+                    self.bot.application_id, emoji.id
+                )
+            except discord.NotFound:
+                pass
+            except discord.HTTPException as e:
+                # left for `reconcile` to clean up, as it's no longer tracked.
+                logger.warning("Failed to delete the player head for %s: %s", uuid, e)
+            finally:
+                # queued as well, so it can't be overtaken by a queued write of the head it evicts.
+                self._forget(uuid)
+
+    def _forget(self, uuid: str):
+        self.bot.write_queue.enqueue(
+            """
+            UPDATE minecraft_heads
+                SET emoji_id = NULL, emoji_name = NULL
+            WHERE uuid = $1;
+        """,
+            uuid,
+            key=uuid,
+        )
+
+    async def reconcile(self):
+        """
+        Drops heads whose emoji no longer exists on discord, and deletes head emojis we don't
+        know about (i.e. ones created before heads were tracked by uuid).
+        """
+
+        # heads created while fetching wouldn't be in the response, so only the ones from
+        # before are checked.
+        snapshot = dict(self._cache)
+
         emojis = await self.bot.fetch_application_emojis()
+        existing = {emoji.id for emoji in emojis}
+
+        missing = [
+            uuid
+            for uuid, emoji in snapshot.items()
+            if emoji.id not in existing and self._cache.get(uuid) == emoji
+        ]
+
+        for uuid in missing:
+            del self._cache[uuid]
+            self._forget(uuid)
+
+        tracked = {head.id for head in self._cache.values()}
+        untracked = [
+            emoji
+            for emoji in emojis
+            if emoji.name.endswith("_head") and emoji.id not in tracked
+        ]
 
-        for emoji in emojis:
-            if emoji.name.endswith("_head"):
-                name, _ = emoji.name.rsplit("_", maxsplit=1)
+        for emoji in untracked:
+            # re-checked right before deleting, in case it was created in the meantime.
+            if any(head.id == emoji.id for head in self._cache.values()):
+                continue
 
-                self._cache[name] = emoji
+            logger.debug("Deleting untracked player head: %s", emoji.name)
+            await emoji.delete()
+
+        logger.debug(
+            "Reconciled player heads, %s were missing from discord.", len(missing)
+        )
 
     async def fetch(
         self,
         uuid: str,
         *,
         size: int = 128,
-    ) -> bytes:
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> Optional[HeadImage]:
+        """
+        Downloads the player's head, returns `None` if it hasn't changed since `etag`/`last_modified`.
+        """
+
+        headers: dict[str, str] = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
         async with self.bot.session.get(
-            f"https://crafthead.net/avatar/{uuid}/{size}"
+            f"https://crafthead.net/avatar/{uuid}/{size}",
+            headers=headers,
         ) as req:
-            return await req.read()
+            if req.status == 304:
+                return None
+
+            if req.status != 200:
+                raise Exception(
+                    f"Recieved an {req.status} status code while fetching the head of: {uuid}"
+                )
+
+            return HeadImage(
+                data=await req.read(),
+                etag=req.headers.get("ETag"),
+                last_modified=req.headers.get("Last-Modified"),
+            )
 
     async def create(
         self,
         player: JavaStatusPlayer,
         *,
-        last_updated_at: Optional[datetime.datetime] = None,
-    ):
-        async with self._lock:
-            name = player.name.lower().replace(".", "_")
-            if name in self._cache:
-                return
+        image: Optional[HeadImage] = None,
+    ) -> discord.PartialEmoji:
+        return await asyncio.shield(self._create(player, image=image))
+
+    def _create(
+        self,
+        player: JavaStatusPlayer,
+        *,
+        image: Optional[HeadImage] = None,
+    ) -> asyncio.Task[discord.PartialEmoji]:
+        task = self._pending.get(player.uuid)
+        if not task:
+            task = asyncio.create_task(self._do_create(player, image=image))
+            task.add_done_callback(lambda t: self._on_create_done(player, t))
+
+            self._pending[player.uuid] = task
 
-            logger.debug("Creating a player head emoji for: %s (%s)", name, player.uuid)
+        return task
 
-            player_head = await self.fetch(player.uuid)
-            hash_ = hashlib.sha256(player_head).hexdigest()
+    def _on_create_done(
+        self,
+        player: JavaStatusPlayer,
+        task: asyncio.Task[discord.PartialEmoji],
+    ):
+        del self._pending[player.uuid]
 
-            emoji = await self.bot.create_application_emoji(
-                name=f"{name}_head",
-                image=player_head,
+        if not task.cancelled() and task.exception():
+            logger.error(
+                "Failed to create the player head for %s (%s): %s",
+                player.name,
+                player.uuid,
+                task.exception(),
             )
 
-            async with self.bot.pool.acquire() as conn:
-                await conn.execute(
-                    """
-                    INSERT INTO minecraft_heads (uuid, emoji_hash, last_updated_at)
-                        VALUES ($1, $2, $3)
-                    ON CONFLICT (uuid) 
-                        DO UPDATE SET 
-                            emoji_hash = $2,
-                            last_updated_at = $3;
-                """,
-                    player.uuid,
-                    hash_,
-                    last_updated_at or datetime.datetime.now(),
-                )
+    async def _do_create(
+        self,
+        player: JavaStatusPlayer,
+        *,
+        image: Optional[HeadImage] = None,
+    ) -> discord.PartialEmoji:
+        if player.uuid in self._cache:
+            return self._cache[player.uuid]
 
-            self._cache[name] = emoji
-            logger.debug("Created the player head.")
+        async with self._semaphore:
+            await self._reserve()
 
-    async def delete(self, name: str):
-        emoji = self._cache.pop(name)
-        await emoji.delete()
+            try:
+                return await self._upload(player, image=image)
+            finally:
+                self._reserved -= 1
 
-    async def _validate_and_update(
+    async def _upload(
         self,
         player: JavaStatusPlayer,
-    ):
-        async with self.bot.pool.acquire() as conn:
-            player_data = await conn.fetchone(
-                """
-                SELECT *
-                    FROM minecraft_heads
-                WHERE
-                    uuid = $1;
-            """,
-                player.uuid,
+        *,
+        image: Optional[HeadImage] = None,
+    ) -> discord.PartialEmoji:
+        logger.debug(
+            "Creating a player head emoji for: %s (%s)", player.name, player.uuid
+        )
+
+        image = image or await self.fetch(player.uuid)
+        assert image  # unconditional requests always return something.
+
+        hash_ = hashlib.sha256(image.data).hexdigest()
+        now = datetime.datetime.now()
+
+        created = await self.bot.create_application_emoji(
+            name=self.emoji_name(player.uuid),
+            image=image.data,
+        )
+
+        emoji = discord.PartialEmoji(name=created.name, id=created.id)
+        self._cache[player.uuid] = emoji
+        self._info[player.uuid] = HeadInfo(
+            emoji_hash=hash_,
+            etag=image.etag,
+            last_modified=image.last_modified,
+            checked_at=now,
+        )
+
+        self.bot.write_queue.enqueue(
+            """
+            INSERT INTO minecraft_heads (
+                uuid, emoji_hash, emoji_id, emoji_name,
+                etag, last_modified, last_updated_at, last_used_at
             )
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+            ON CONFLICT (uuid) 
+                DO UPDATE SET 
+                    emoji_hash = $2,
+                    emoji_id = $3,
+                    emoji_name = $4,
+                    etag = $5,
+                    last_modified = $6,
+                    last_updated_at = $7,
+                    last_used_at = $8;
+        """,
+            player.uuid,
+            hash_,
+            emoji.id,
+            emoji.name,
+            image.etag,
+            image.last_modified,
+            now,
+            now,
+            key=player.uuid,
+        )
+
+        logger.debug("Created the player head.")
 
-        if not player_data:
+        return emoji
+
+    async def delete(self, uuid: str):
+        emoji = self._cache.pop(uuid)
+        self._info.pop(uuid, None)
+
+        assert emoji.id and self.bot.application_id
+        await self.bot.http.delete_application_emoji(self.bot.application_id, emoji.id)
+
+    def start_refreshing(self):
+        if self._refresh_workers:
             return
 
-        last_updated_at = datetime.datetime.fromisoformat(
-            player_data["last_updated_at"]
+        self._refresh_workers.extend(
+            self.bot.loop.create_task(self._refresh_worker())
+            for _ in range(self.refresh_concurrency)
         )
 
-        now = datetime.datetime.now()
+    def stop_refreshing(self):
+        for task in self._refresh_workers:
+            task.cancel()
 
-        lower_limit = now - last_updated_at
-        upper_limit = datetime.timedelta(minutes=10)
+        self._refresh_workers.clear()
 
-        if lower_limit < upper_limit:
+    def enqueue_refresh(self, player: JavaStatusPlayer):
+        info = self._info.get(player.uuid)
+        if info and datetime.datetime.now() - info.checked_at < self.refresh_interval:
             return
 
-        async with self.bot.pool.acquire() as conn:
-            await conn.execute(
+        if player.uuid in self._queued:
+            return
+
+        self._queued.add(player.uuid)
+        self._refresh_queue.put_nowait(player)
+
+    async def _refresh_worker(self):
+        while True:
+            player = await self._refresh_queue.get()
+
+            try:
+                outcome = await self._refresh(player)
+            except Exception as err:
+                outcome = "failed"
+                logger.error(
+                    "Failed to refresh the player head for %s (%s): %s",
+                    player.name,
+                    player.uuid,
+                    err,
+                )
+            finally:
+                self._queued.discard(player.uuid)
+
+            self.refresh_outcomes[outcome] += 1
+
+    async def _refresh(self, player: JavaStatusPlayer) -> str:
+        info = self._info.get(player.uuid)
+        if not info or player.uuid not in self._cache:
+            return "skipped"  # evicted while queued.
+
+        image = await self.fetch(
+            player.uuid,
+            etag=info.etag,
+            last_modified=info.last_modified,
+        )
+
+        now = datetime.datetime.now()
+
+        if image is None or hashlib.sha256(image.data).hexdigest() == info.emoji_hash:
+            if image:  # the validators can change even if the image doesn't.
+                info = info._replace(etag=image.etag, last_modified=image.last_modified)
+
+            self._info[player.uuid] = info._replace(checked_at=now)
+
+            self.bot.write_queue.enqueue(
                 """
-                    UPDATE
-                        minecraft_heads
-                    SET
-                        last_updated_at = $1
-                    WHERE
-                        uuid = $2
-                """,
+                UPDATE minecraft_heads
+                    SET etag = $1, last_modified = $2, last_updated_at = $3
+                WHERE uuid = $4;
+            """,
+                info.etag,
+                info.last_modified,
                 now,
                 player.uuid,
+                key=player.uuid,
             )
 
-        player_head = await self.fetch(player.uuid)
-        hash_ = hashlib.sha256(player_head).hexdigest()
-
-        if player_data["emoji_hash"] == hash_:
-            return
+            return "unchanged"
 
         logger.debug("Updating player head for: %s (%s)", player.name, player.uuid)
 
-        await self.delete(player.name.lower())
-        await self.create(player)
+        await self.delete(player.uuid)
+        await self.create(player, image=image)
+
+        return "updated"
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import time
+import asyncio
+
+from utils import logger
+
+from typing import TYPE_CHECKING, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from mcstatus.status_response import JavaStatusResponse
+
+    from utils import Estella
+
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+RAW = 0  # raw samples are stored as buckets of their own.
+FIVE_MINUTES = 5 * 60
+
+# resolution -> retention, in seconds.
+# (every sample is rolled up into every resolution as it's written, so pruning never loses data)
+RESOLUTIONS: dict[int, int] = {
+    RAW: DAY,
+    FIVE_MINUTES: 30 * DAY,
+    HOUR: 365 * DAY,
+}
+
+
+class HistoryBucket(NamedTuple):
+    bucket: int
+    players_sum: int
+    players_peak: int
+    latency_sum: float
+    latency_samples: int
+    online: int
+    samples: int
+
+    @property
+    def players(self) -> Optional[float]:
+        return self.players_sum / self.online if self.online else None
+
+    @property
+    def latency(self) -> Optional[float]:
+        return self.latency_sum / self.latency_samples if self.latency_samples else None
+
+    def merge(self, other: HistoryBucket) -> HistoryBucket:
+        return HistoryBucket(
+            bucket=self.bucket,
+            players_sum=self.players_sum + other.players_sum,
+            players_peak=max(self.players_peak, other.players_peak),
+            latency_sum=self.latency_sum + other.latency_sum,
+            latency_samples=self.latency_samples + other.latency_samples,
+            online=self.online + other.online,
+            samples=self.samples + other.samples,
+        )
+
+
+class MinecraftStatusHistory:
+    """
+    Time series of player counts and latency per server, downsampled into 5 minute and hourly
+    rollups as samples come in, and written in batches.
+    """
+
+    def __init__(
+        self,
+        bot: Estella,
+        *,
+        flush_interval: float = 60,
+        batch_size: int = 500,
+        prune_interval: float = HOUR,
+    ):
+        self.bot = bot
+
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.prune_interval = prune_interval
+
+        # pre-aggregated, so a batch never writes the same bucket twice.
+        self._pending: dict[tuple[str, int, int], HistoryBucket] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task[None]] = None
+        self._last_pruned = 0.0
+
+    def start(self):
+        if not self._task:
+            self._task = self.bot.loop.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+        await self.flush()
+
+    def record(
+        self,
+        server_ip: str,
+        status: Optional[JavaStatusResponse],
+        latency: Optional[float],
+    ):
+        now = int(time.time())
+
+        sample = HistoryBucket(
+            bucket=now,
+            players_sum=status.players.online if status else 0,
+            players_peak=status.players.online if status else 0,
+            latency_sum=latency or 0.0,
+            latency_samples=int(latency is not None),
+            online=int(status is not None),
+            samples=1,
+        )
+
+        for resolution in RESOLUTIONS:
+            bucket = now - now % resolution if resolution else now
+            key = (server_ip, resolution, bucket)
+
+            pending = self._pending.get(key)
+            self._pending[key] = (
+                pending.merge(sample) if pending else sample._replace(bucket=bucket)
+            )
+
+        if len(self._pending) >= self.batch_size:
+            self.bot.loop.create_task(self.flush())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+
+            try:
+                await self.flush()
+
+                if time.monotonic() - self._last_pruned >= self.prune_interval:
+                    await self.prune()
+            except Exception as err:
+                logger.error("Failed to write minecraft status history: %s", err)
+
+    async def flush(self):
+        async with self._lock:
+            if not self._pending:
+                return
+
+            pending, self._pending = self._pending, {}
+
+            async with self.bot.pool.acquire() as conn:
+                async with conn.transaction():
+                    await conn.executemany(
+                        """
+                        INSERT INTO minecraft_status_history (
+                            ip, resolution, bucket,
+                            players_sum, players_peak,
+                            latency_sum, latency_samples,
+                            online, samples
+                        )
+                            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+                        ON CONFLICT (ip, resolution, bucket)
+                            DO UPDATE SET
+                                players_sum = players_sum + excluded.players_sum,
+                                players_peak = MAX(players_peak, excluded.players_peak),
+                                latency_sum = latency_sum + excluded.latency_sum,
+                                latency_samples = latency_samples + excluded.latency_samples,
+                                online = online + excluded.online,
+                                samples = samples + excluded.samples;
+                    """,
+                        [
+                            (server_ip, resolution, *bucket)
+                            for (server_ip, resolution, _), bucket in pending.items()
+                        ],
+                    )
+
+    async def prune(self):
+        now = int(time.time())
+
+        async with self.bot.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.executemany(
+                    """
+                    DELETE FROM minecraft_status_history
+                        WHERE resolution = $1
+                        AND   bucket < $2;
+                """,
+                    [
+                        (resolution, now - retention)
+                        for resolution, retention in RESOLUTIONS.items()
+                    ],
+                )
+
+        self._last_pruned = time.monotonic()
+
+    async def fetch(
+        self,
+        server_ip: str,
+        *,
+        period: int,
+    ) -> list[HistoryBucket]:
+        # the coarsest rollup that still gives a useful amount of points.
+        resolution = FIVE_MINUTES if period <= DAY else HOUR
+
+        # so the most recent, unwritten, samples are included as well.
+        await self.flush()
+
+        async with self.bot.pool.acquire() as conn:
+            rows = await conn.fetchall(
+                """
+                SELECT
+                    bucket, players_sum, players_peak,
+                    latency_sum, latency_samples,
+                    online, samples
+                FROM minecraft_status_history
+                WHERE ip = $1
+                AND   resolution = $2
+                AND   bucket >= $3
+                ORDER BY bucket;
+            """,
+                server_ip,
+                resolution,
+                int(time.time()) - period,
+            )
+
+        return [HistoryBucket(*row) for row in rows]
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import time
+import heapq
+import random
+import asyncio
+
+from utils import logger
+
+from typing import TYPE_CHECKING, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from mcstatus.status_response import JavaStatusResponse
+
+    from .cache import MinecraftServerCache, MinecraftStatusCache
+    from .history import MinecraftStatusHistory
+
+
+class ServerSnapshot(NamedTuple):
+    status: Optional[JavaStatusResponse]  # `None` when the last poll failed.
+    latency: Optional[float]
+    polled_at: float
+    failures: int
+
+
+class MinecraftStatusPoller:
+    """
+    Periodically polls every assigned server in the background, so commands can be answered
+    from the last snapshot instead of waiting on the network.
+    """
+
+    def __init__(
+        self,
+        server_cache: MinecraftServerCache,
+        status_cache: MinecraftStatusCache,
+        *,
+        history: Optional[MinecraftStatusHistory] = None,
+        interval: float = 60,
+        max_backoff: float = 30 * 60,
+        jitter: float = 0.1,
+        concurrency: int = 16,
+    ):
+        self.server_cache = server_cache
+        self.status_cache = status_cache
+        self.history = history
+
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.concurrency = concurrency
+
+        self.snapshots: dict[str, ServerSnapshot] = {}
+
+        self._due: list[tuple[float, str]] = []  # heap of (due at, ip)
+        self._scheduled: set[str] = set()
+        self._queue: asyncio.Queue[str] = asyncio.Queue(maxsize=concurrency)
+        self._tasks: list[asyncio.Task[None]] = []
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self):
+        if self._tasks:
+            return
+
+        self._tasks.append(asyncio.create_task(self._schedule()))
+        self._tasks.extend(
+            asyncio.create_task(self._worker()) for _ in range(self.concurrency)
+        )
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+
+        self._tasks.clear()
+
+    def snapshot(self, server_ip: str) -> Optional[ServerSnapshot]:
+        snapshot = self.snapshots.get(server_ip)
+
+        # jitter can push the next poll slightly past the interval, hence the leeway.
+        max_age = self.interval * (2 + self.jitter)
+        if (
+            snapshot
+            and snapshot.status
+            and time.monotonic() - snapshot.polled_at < max_age
+        ):
+            return snapshot
+
+        return None
+
+    async def _schedule(self):
+        while True:
+            now = time.monotonic()
+            server_ips = self.server_cache.server_ips()
+
+            # every scheduled ip has exactly one entry in the heap (or is being polled).
+            for server_ip in server_ips - self._scheduled:
+                # spread the first round out, rather than polling everything at once.
+                due_at = now + random.uniform(0, self.interval)
+
+                heapq.heappush(self._due, (due_at, server_ip))
+                self._scheduled.add(server_ip)
+
+            while self._due and self._due[0][0] <= now:
+                _, server_ip = heapq.heappop(self._due)
+
+                if server_ip not in server_ips:  # unassigned since.
+                    self._scheduled.discard(server_ip)
+                    self.snapshots.pop(server_ip, None)
+                    continue
+
+                # blocks while every worker is busy, so nothing piles up.
+                await self._queue.put(server_ip)
+
+            delay = self._due[0][0] - time.monotonic() if self._due else self.interval
+            await asyncio.sleep(min(max(delay, 0), 1))
+
+    async def _worker(self):
+        while True:
+            server_ip = await self._queue.get()
+
+            try:
+                await self._poll(server_ip)
+            except Exception as err:
+                logger.error("Failed to poll %s: %s", server_ip, err)
+            finally:
+                self._queue.task_done()
+
+    async def _poll(self, server_ip: str):
+        previous = self.snapshots.get(server_ip)
+
+        try:
+            server = await self.server_cache.server(server_ip)
+            status = await self.status_cache.refresh(server)
+        except Exception:
+            failures = (previous.failures if previous else 0) + 1
+            snapshot = ServerSnapshot(None, None, time.monotonic(), failures)
+
+            delay = min(self.interval * 2**failures, self.max_backoff)
+        else:
+            # sampled on every poll, so the latency history doesn't depend on command usage.
+            try:
+                latency = await server.ping()
+            except Exception:
+                latency = None
+
+            snapshot = ServerSnapshot(status, latency, time.monotonic(), 0)
+            delay = self.interval
+
+        self.snapshots[server_ip] = snapshot
+
+        if self.history:
+            self.history.record(server_ip, snapshot.status, snapshot.latency)
+
+        delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        heapq.heappush(self._due, (time.monotonic() + delay, server_ip))
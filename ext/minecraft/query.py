@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import time
+import socket
+import secrets
+import struct
+import asyncio
+
+from mcstatus.querier import QueryResponse
+from mcstatus.protocol.connection import Connection
+
+from utils import logger
+
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from .cache import MinecraftServer
+
+
+MAGIC_PREFIX = b"\xfe\xfd"
+PADDING = b"\x00\x00\x00\x00"
+
+PACKET_TYPE_QUERY = 0
+PACKET_TYPE_CHALLENGE = 9
+
+SocketAddress = tuple[str, int]
+
+
+class _QueryProtocol(asyncio.DatagramProtocol):
+    def __init__(self, client: MinecraftQueryClient):
+        self.client = client
+
+    def datagram_received(self, data: bytes, addr: SocketAddress):
+        self.client._on_datagram(data, addr)  # pyright: ignore[reportPrivateUsage]
+
+    def error_received(self, exc: Exception):
+        logger.debug("Query endpoint error: %s", exc)
+
+    def connection_lost(self, exc: Optional[Exception]):
+        self.client._transport = None  # pyright: ignore[reportPrivateUsage]
+
+
+class MinecraftQueryClient:
+    """
+    GS4 Query client sharing a single UDP socket between every server, with responses routed
+    back by their session id.
+    """
+
+    def __init__(
+        self,
+        *,
+        timeout: float = 1.5,
+        ttl: float = 5,
+        challenge_ttl: float = 25,
+        unsupported_ttl: float = 10 * 60,
+    ):
+        self.timeout = timeout
+        self.ttl = ttl
+        # servers rotate their tokens every 30 seconds.
+        self.challenge_ttl = challenge_ttl
+        self.unsupported_ttl = unsupported_ttl
+
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._transport_lock = asyncio.Lock()
+
+        # session id -> (server address, packet type, response)
+        self._pending: dict[int, tuple[SocketAddress, int, asyncio.Future[bytes]]] = {}
+        self._challenges: dict[SocketAddress, tuple[int, float]] = {}
+        self._unsupported: dict[str, float] = {}  # server ip -> retry at
+        self._cache: dict[str, tuple[float, QueryResponse]] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    async def _endpoint(self) -> asyncio.DatagramTransport:
+        async with self._transport_lock:
+            if not self._transport:
+                loop = asyncio.get_running_loop()
+                self._transport, _ = await loop.create_datagram_endpoint(
+                    lambda: _QueryProtocol(self),
+                    local_addr=("0.0.0.0", 0),
+                )
+
+            return self._transport
+
+    def _on_datagram(self, data: bytes, addr: SocketAddress):
+        if len(data) < 5:
+            return
+
+        packet_type, session_id = struct.unpack(">BI", data[:5])
+
+        pending = self._pending.get(session_id)
+        if not pending:
+            return
+
+        # the session id alone is easy enough to guess, so responses from anywhere other
+        # than the server it was sent to are dropped.
+        expected_addr, expected_type, future = pending
+        if addr[:2] != expected_addr or packet_type != expected_type:
+            logger.debug("Dropping an unexpected query response from %s.", addr)
+            return
+
+        if not future.done():
+            future.set_result(data[5:])
+
+    def _session_id(self) -> int:
+        while True:
+            # minecraft only looks at the lower 4 bits of each byte.
+            session_id = secrets.randbits(32) & 0x0F0F0F0F
+            if session_id not in self._pending:
+                return session_id
+
+    async def _request(
+        self,
+        addr: SocketAddress,
+        packet_type: int,
+        payload: bytes = b"",
+    ) -> bytes:
+        transport = await self._endpoint()
+
+        session_id = self._session_id()
+        future: asyncio.Future[bytes] = asyncio.get_running_loop().create_future()
+        self._pending[session_id] = (addr, packet_type, future)
+
+        transport.sendto(
+            MAGIC_PREFIX + struct.pack(">BI", packet_type, session_id) + payload,
+            addr,
+        )
+
+        try:
+            return await asyncio.wait_for(future, timeout=self.timeout)
+        finally:
+            del self._pending[session_id]
+
+    def _cached_challenge(self, addr: SocketAddress) -> Optional[int]:
+        cached = self._challenges.get(addr)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+        return None
+
+    async def _challenge(self, addr: SocketAddress) -> int:
+        response = await self._request(addr, PACKET_TYPE_CHALLENGE)
+        token = int(response.rstrip(b"\x00").decode("ascii"))
+
+        self._challenges[addr] = (token, time.monotonic() + self.challenge_ttl)
+        return token
+
+    async def _full_stat(self, addr: SocketAddress, token: int) -> bytes:
+        return await self._request(
+            addr,
+            PACKET_TYPE_QUERY,
+            struct.pack(">i", token) + PADDING,
+        )
+
+    async def _resolve(self, server: MinecraftServer) -> SocketAddress:
+        address = server.address
+
+        # `sendto` would otherwise resolve the hostname synchronously.
+        infos = await asyncio.get_running_loop().getaddrinfo(
+            address.host,
+            address.port,
+            family=socket.AF_INET,
+            type=socket.SOCK_DGRAM,
+        )
+
+        host, port = infos[0][4][:2]
+        return str(host), int(port)
+
+    async def query(self, server: MinecraftServer) -> Optional[QueryResponse]:
+        """
+        Returns `None` if the server doesn't have query enabled.
+        """
+
+        now = time.monotonic()
+
+        if self._unsupported.get(server.ip, 0) > now:
+            return None
+
+        cached = self._cache.get(server.ip)
+        if cached and now - cached[0] < self.ttl:
+            return cached[1]
+
+        try:
+            addr = await self._resolve(server)
+
+            cached_token = self._cached_challenge(addr)
+
+            try:
+                token = (
+                    cached_token
+                    if cached_token is not None
+                    else await self._challenge(addr)
+                )
+                response = await self._full_stat(addr, token)
+            except asyncio.TimeoutError:
+                # a server without query never answers the challenge either, so only a cached
+                # token is worth retrying, as it could have been rotated early.
+                if cached_token is None:
+                    raise
+
+                response = await self._full_stat(addr, await self._challenge(addr))
+
+            connection = Connection()
+            connection.receive(response)
+
+            result = QueryResponse.from_connection(connection)
+        except Exception as err:
+            logger.debug("Query isn't available for %s: %s", server.ip, err)
+
+            self._unsupported[server.ip] = now + self.unsupported_ttl
+            return None
+
+        self._cache[server.ip] = (time.monotonic(), result)
+        return result
+
+    def close(self):
+        if self._transport:
+            self._transport.close()
+            self._transport = None
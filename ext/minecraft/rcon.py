@@ -0,0 +1,395 @@
+from __future__ import annotations
+
+import re
+import time
+import struct
+import asyncio
+import itertools
+
+from mcstatus.status_response import JavaStatusPlayer
+
+from utils import logger
+
+from typing import TYPE_CHECKING, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from utils import Estella
+
+    from .cache import MinecraftServer
+
+
+SERVERDATA_RESPONSE_VALUE = 0
+SERVERDATA_EXECCOMMAND = 2
+SERVERDATA_AUTH_RESPONSE = 2
+SERVERDATA_AUTH = 3
+
+LIST_RE = re.compile(
+    r"There are (?P<online>\d+) of a max of (?P<max>\d+) players online"
+)
+PLAYER_UUID_RE = re.compile(r"(?P<name>\w+) \((?P<uuid>[0-9a-f-]{36})\)")
+
+
+class RconError(Exception): ...
+
+
+class RconAuthenticationError(RconError): ...
+
+
+class RconPlayerList(NamedTuple):
+    online: int
+    max: int
+    players: list[JavaStatusPlayer]
+
+
+class RconConnection:
+    """
+    A single authenticated RCON connection, which supports sending commands without waiting for
+    the previous ones to be answered.
+    """
+
+    def __init__(self, host: str, port: int, password: str, *, timeout: float = 5):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.timeout = timeout
+
+        self._ids = itertools.count(1)
+        self._pending: dict[int, asyncio.Future[str]] = {}
+        self._fragments: dict[int, list[str]] = {}
+        self._sentinels: dict[int, int] = {}  # sentinel id -> command id
+
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._read_task: Optional[asyncio.Task[None]] = None
+
+    @property
+    def closed(self) -> bool:
+        return self._read_task is None or self._read_task.done()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port),
+            timeout=self.timeout,
+        )
+
+        try:
+            await asyncio.wait_for(self._authenticate(), timeout=self.timeout)
+        except BaseException:
+            self._writer.close()
+            raise
+
+        self._read_task = asyncio.create_task(self._read_loop())
+
+    async def _authenticate(self):
+        request_id = next(self._ids)
+        self._write(request_id, SERVERDATA_AUTH, self.password)
+
+        while True:
+            response_id, type_, _ = await self._read_packet()
+
+            if type_ != SERVERDATA_AUTH_RESPONSE:
+                continue  # some implementations send an empty response value first.
+
+            if response_id == -1:
+                raise RconAuthenticationError(
+                    f"Incorrect RCON password for {self.host}:{self.port}."
+                )
+
+            return
+
+    def _write(self, request_id: int, type_: int, body: str):
+        assert self._writer
+
+        payload = struct.pack("<ii", request_id, type_) + body.encode() + b"\x00\x00"
+        self._writer.write(struct.pack("<i", len(payload)) + payload)
+
+    async def _read_packet(self) -> tuple[int, int, str]:
+        assert self._reader
+
+        (length,) = struct.unpack("<i", await self._reader.readexactly(4))
+        payload = await self._reader.readexactly(length)
+
+        request_id, type_ = struct.unpack("<ii", payload[:8])
+        return request_id, type_, payload[8:-2].decode(errors="replace")
+
+    async def _read_loop(self):
+        try:
+            while True:
+                request_id, _, body = await self._read_packet()
+
+                # the sentinel is answered after every fragment of its command.
+                command_id = self._sentinels.pop(request_id, None)
+                if command_id is not None:
+                    fragments = self._fragments.pop(command_id, [])
+
+                    future = self._pending.pop(command_id, None)
+                    if future and not future.done():
+                        future.set_result("".join(fragments))
+                elif request_id in self._pending:
+                    self._fragments.setdefault(request_id, []).append(body)
+        except Exception as err:
+            error = RconError(
+                f"Lost the RCON connection to {self.host}:{self.port}: {err}"
+            )
+
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+
+            self._pending.clear()
+        finally:
+            if self._writer:
+                self._writer.close()
+
+    async def command(self, command: str) -> str:
+        if self.closed:
+            raise RconError(
+                f"The RCON connection to {self.host}:{self.port} is closed."
+            )
+
+        request_id, sentinel_id = next(self._ids), next(self._ids)
+
+        future: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self._sentinels[sentinel_id] = request_id
+
+        # responses can be split over several packets, with nothing marking the last one, so
+        # an empty packet is sent after it, which the server only answers once it's done.
+        self._write(request_id, SERVERDATA_EXECCOMMAND, command)
+        self._write(sentinel_id, SERVERDATA_RESPONSE_VALUE, "")
+
+        try:
+            return await asyncio.wait_for(future, timeout=self.timeout)
+        finally:
+            self._pending.pop(request_id, None)
+            self._fragments.pop(request_id, None)
+            self._sentinels.pop(sentinel_id, None)
+
+    def close(self):
+        if self._read_task:
+            self._read_task.cancel()
+        elif self._writer:
+            self._writer.close()
+
+
+class RconPool:
+    """
+    Keeps a few authenticated connections to a server open, and reconnects with an exponential
+    backoff when they drop.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        password: str,
+        *,
+        size: int = 2,
+        max_in_flight: int = 8,
+        max_backoff: float = 5 * 60,
+    ):
+        self.host = host
+        self.port = port
+        self.password = password
+
+        self.size = size
+        self.max_in_flight = max_in_flight
+        self.max_backoff = max_backoff
+
+        self._connections: list[RconConnection] = []
+        self._lock = asyncio.Lock()
+
+        self._failures = 0
+        self._retry_at = 0.0
+
+    @property
+    def open_connections(self) -> int:
+        return sum(1 for conn in self._connections if not conn.closed)
+
+    def _least_busy(self) -> tuple[Optional[RconConnection], bool]:
+        """
+        The least busy connection, and whether it should be used rather than opening another.
+        """
+
+        self._connections = [conn for conn in self._connections if not conn.closed]
+
+        conn = min(self._connections, key=lambda c: c.in_flight, default=None)
+        usable = conn is not None and (
+            conn.in_flight < self.max_in_flight or len(self._connections) >= self.size
+        )
+
+        return conn, usable
+
+    async def _acquire(self) -> RconConnection:
+        conn, usable = self._least_busy()
+        if conn and usable:
+            return conn
+
+        async with self._lock:
+            # checked again, as the commands queued up behind the lock may have connected.
+            conn, usable = self._least_busy()
+            if conn and usable:
+                return conn
+
+            if time.monotonic() < self._retry_at:
+                if conn:
+                    return conn
+
+                raise RconError(
+                    f"Not reconnecting to {self.host}:{self.port} yet, it failed recently."
+                )
+
+            new_conn = RconConnection(self.host, self.port, self.password)
+
+            try:
+                await new_conn.connect()
+            except Exception as err:
+                self._failures += 1
+                self._retry_at = time.monotonic() + min(
+                    2**self._failures, self.max_backoff
+                )
+
+                # a wrong password won't fix itself either, but is worth surfacing as is.
+                if isinstance(err, RconAuthenticationError):
+                    raise
+
+                if conn:
+                    return conn
+
+                raise RconError(
+                    f"Couldn't connect to RCON at {self.host}:{self.port}: {err}"
+                )
+
+            self._failures = 0
+            self._connections.append(new_conn)
+
+            return new_conn
+
+    async def command(self, command: str) -> str:
+        conn = await self._acquire()
+        return await conn.command(command)
+
+    def close(self):
+        for conn in self._connections:
+            conn.close()
+
+        self._connections.clear()
+
+
+class RconCredentials(NamedTuple):
+    port: int
+    password: str
+
+
+class MinecraftRconManager:
+    def __init__(self, bot: Estella):
+        self.bot = bot
+
+        self._credentials: dict[str, RconCredentials] = {}  # server ip -> credentials
+        self._pools: dict[str, RconPool] = {}
+
+    @property
+    def pools(self) -> int:
+        return len(self._pools)
+
+    async def populate(self):
+        async with self.bot.pool.acquire() as conn:
+            rows = await conn.fetchall(
+                """
+                SELECT ip, port, password
+                    FROM minecraft_rcon_credentials;
+            """
+            )
+
+        self._credentials = {
+            row["ip"]: RconCredentials(row["port"], row["password"]) for row in rows
+        }
+
+    def has_credentials(self, server: MinecraftServer) -> bool:
+        return server.ip in self._credentials
+
+    def pool(self, server: MinecraftServer) -> Optional[RconPool]:
+        credentials = self._credentials.get(server.ip)
+        if not credentials:
+            return None
+
+        pool = self._pools.get(server.ip)
+        if not pool or pool.host != server.address.host:
+            if pool:
+                pool.close()
+
+            pool = self._pools[server.ip] = RconPool(
+                server.address.host,
+                credentials.port,
+                credentials.password,
+            )
+
+        return pool
+
+    async def verify(self, server: MinecraftServer, *, port: int, password: str):
+        conn = RconConnection(server.address.host, port, password)
+
+        await conn.connect()
+        conn.close()
+
+    async def set_credentials(
+        self,
+        server: MinecraftServer,
+        *,
+        port: int,
+        password: str,
+        assigned_by: int,
+    ):
+        async with self.bot.pool.acquire() as conn:
+            await conn.execute(
+                """
+                INSERT INTO minecraft_rcon_credentials (ip, port, password, assigned_by)
+                    VALUES ($1, $2, $3, $4)
+                ON CONFLICT (ip)
+                    DO UPDATE SET
+                        port = $2,
+                        password = $3,
+                        assigned_by = $4;
+            """,
+                server.ip,
+                port,
+                password,
+                assigned_by,
+            )
+
+        self._credentials[server.ip] = RconCredentials(port, password)
+
+        pool = self._pools.pop(server.ip, None)
+        if pool:
+            pool.close()
+
+    async def players(self, server: MinecraftServer) -> Optional[RconPlayerList]:
+        pool = self.pool(server)
+        if not pool:
+            return None
+
+        response = await pool.command("list uuids")
+
+        match = LIST_RE.search(response)
+        if not match:
+            logger.debug(
+                "Unexpected RCON list response from %s: %r", server.ip, response
+            )
+            return None
+
+        players = [
+            JavaStatusPlayer(name=m["name"], id=m["uuid"])
+            for m in PLAYER_UUID_RE.finditer(response)
+        ]
+
+        return RconPlayerList(int(match["online"]), int(match["max"]), players)
+
+    def close(self):
+        for pool in self._pools.values():
+            pool.close()
+
+        self._pools.clear()
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import time
+import asyncio
+
+from urllib.parse import urlparse
+from collections import OrderedDict
+
+import dns.resolver
+import dns.asyncresolver
+from dns.rdatatype import RdataType
+
+from mcstatus.address import Address
+
+from utils import logger
+
+from typing import TYPE_CHECKING, NamedTuple, cast
+
+if TYPE_CHECKING:
+    from dns.rdtypes.IN.SRV import SRV
+
+
+DEFAULT_PORT = 25565
+
+
+class ResolvedAddress(NamedTuple):
+    address: Address
+    expires_at: float
+
+
+class MinecraftResolver:
+    """
+    Resolves Minecraft server addresses the same way the game's server address field does,
+    without blocking the event loop, caching the results for as long as the SRV record allows.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_ttl: float = 60,
+        max_ttl: float = 60 * 60,
+        negative_ttl: float = 5 * 60,
+        lifetime: float = 3,
+        size: int = 1024,
+    ):
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl  # for addresses without an SRV record.
+        self.lifetime = lifetime
+        self.size = size
+
+        self._cache: OrderedDict[str, ResolvedAddress] = OrderedDict()
+        self._pending: dict[str, asyncio.Task[Address]] = {}
+
+    async def resolve(self, ip: str) -> Address:
+        cached = self._cache.get(ip)
+        if cached:
+            self._cache.move_to_end(ip)
+
+            if cached.expires_at <= time.monotonic():
+                # serve the stale address, a refresh is rarely going to change anything.
+                self._refresh(ip)
+
+            return cached.address
+
+        return await asyncio.shield(self._refresh(ip))
+
+    def _refresh(self, ip: str) -> asyncio.Task[Address]:
+        task = self._pending.get(ip)
+        if not task:
+            task = asyncio.create_task(self._lookup(ip))
+            task.add_done_callback(lambda t: self._on_lookup_done(ip, t))
+
+            self._pending[ip] = task
+
+        return task
+
+    def _on_lookup_done(self, ip: str, task: asyncio.Task[Address]):
+        del self._pending[ip]
+
+        if not task.cancelled() and task.exception():
+            logger.debug("Failed to resolve %s: %s", ip, task.exception())
+
+    async def _lookup(self, ip: str) -> Address:
+        parsed = urlparse(f"//{ip}")
+        if not parsed.hostname:
+            raise ValueError(f"Invalid address {ip!r}, can't parse.")
+
+        # an explicit port skips the SRV lookup entirely, just like the game does.
+        if parsed.port is not None:
+            address = Address(parsed.hostname, parsed.port)
+            self._store(ip, address, self.max_ttl)
+
+            return address
+
+        try:
+            answers = await dns.asyncresolver.resolve(
+                f"_minecraft._tcp.{parsed.hostname}",
+                RdataType.SRV,
+                lifetime=self.lifetime,
+            )
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            address = Address(parsed.hostname, DEFAULT_PORT)
+            self._store(ip, address, self.negative_ttl)
+
+            return address
+
+        record = cast("SRV", answers[0])
+        address = Address(str(record.target).rstrip("."), int(record.port))
+
+        ttl = answers.rrset.ttl if answers.rrset else self.min_ttl
+        self._store(ip, address, ttl)
+
+        return address
+
+    def _store(self, ip: str, address: Address, ttl: float):
+        ttl = min(max(ttl, self.min_ttl), self.max_ttl)
+        self._cache[ip] = ResolvedAddress(address, time.monotonic() + ttl)
+        self._cache.move_to_end(ip)
+
+        if len(self._cache) > self.size:
+            self._cache.popitem(last=False)
+
+    def forget(self, ip: str):
+        self._cache.pop(ip, None)
@@ -5,6 +5,7 @@ from discord.ext import commands
 from discord import app_commands
 
 import zoneinfo
+import functools
 import itertools
 import xml.etree.ElementTree as ET
 
@@ -12,6 +13,7 @@ from fuzzywuzzy import process  # pyright: ignore[reportMissingTypeStubs]
 from pytz import timezone as tz, BaseTzInfo
 
 from datetime import datetime
+from collections import OrderedDict
 
 from typing import TYPE_CHECKING, Optional
 
@@ -21,6 +23,20 @@ if TYPE_CHECKING:
     from utils import Estella
 
 
+SET_TIMEZONE = """
+    INSERT INTO user_timezones
+        VALUES ($1, $2)
+    ON CONFLICT (user_id)
+        DO UPDATE SET timezone = $2
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def get_timezone(name: str) -> BaseTzInfo:
+    # there's only a few hundred zones, so they're shared across every user.
+    return tz(name)
+
+
 async def timezone_auto_complete(
     interaction: discord.Interaction[Estella],
     current: str,
@@ -60,6 +76,10 @@ class Time(commands.Cog):
         self.bot.tree.add_command(get_time)
         self.TIMEZONES: dict[str, str] = {}
 
+        # user id -> timezone, `None` being users who don't have one set.
+        self.user_timezones: OrderedDict[int, Optional[BaseTzInfo]] = OrderedDict()
+        self.user_timezones_capacity = 2048
+
     async def _parse_time_zones(self) -> dict[str, str]:
         async with self.bot.session.get(
             "https://raw.githubusercontent.com/unicode-org/cldr/main/common/bcp47/timezone.xml"
@@ -101,22 +121,42 @@ class Time(commands.Cog):
         if user.bot:
             raise app_commands.CheckFailure("Bots dont have timezones, dummy!")
 
+        if user.id in self.user_timezones:
+            self.user_timezones.move_to_end(user.id)
+            timezone = self.user_timezones[user.id]
+        else:
+            timezone = await self._fetch_user_timezone(user.id)
+            self._cache_user_timezone(user.id, timezone)
+
+        if not timezone:
+            raise app_commands.CheckFailure("This user has no timezone set.")
+
+        return self.format_timezone(timezone) if formatted else timezone
+
+    async def _fetch_user_timezone(self, user_id: int) -> Optional[BaseTzInfo]:
+        # in case it was set, but evicted since.
+        queued = self.bot.write_queue.pending(SET_TIMEZONE, user_id)
+        if queued:
+            return get_timezone(queued[1])
+
         async with self.bot.pool.acquire() as conn:
-            timezone = await conn.fetchone(
+            row = await conn.fetchone(
                 """
                 SELECT timezone
                     FROM user_timezones
                 WHERE user_id = $1
                 """,
-                user.id,
+                user_id,
             )
 
-        if not timezone:
-            raise app_commands.CheckFailure("This user has no timezone set.")
+        return get_timezone(row[0]) if row else None
 
-        timezone = tz(timezone[0])
+    def _cache_user_timezone(self, user_id: int, timezone: Optional[BaseTzInfo]):
+        self.user_timezones[user_id] = timezone
+        self.user_timezones.move_to_end(user_id)
 
-        return self.format_timezone(timezone) if formatted else timezone
+        if len(self.user_timezones) > self.user_timezones_capacity:
+            self.user_timezones.popitem(last=False)
 
     def format_timezone(self, timezone: BaseTzInfo) -> str:
         time = discord.utils.utcnow().astimezone(timezone)
@@ -154,17 +194,14 @@ class Time(commands.Cog):
                 ephemeral=True,
             )
 
-        async with self.bot.pool.acquire() as conn:
-            await conn.execute(
-                """
-                INSERT INTO user_timezones
-                    VALUES ($1, $2)
-                ON CONFLICT (user_id)
-                    DO UPDATE SET timezone = $2
-                """,
-                interaction.user.id,
-                timezone,
-            )
+        self.bot.write_queue.enqueue(
+            SET_TIMEZONE,
+            interaction.user.id,
+            timezone,
+            key=interaction.user.id,
+        )
+
+        self._cache_user_timezone(interaction.user.id, get_timezone(timezone))
 
         await interaction.response.send_message(
             f"Done! I've set your timezone as `{timezone}`",
@@ -186,7 +223,7 @@ class Time(commands.Cog):
                 ephemeral=False,
             )
 
-        formatted = self.format_timezone(tz(timezone))
+        formatted = self.format_timezone(get_timezone(timezone))
         await interaction.response.send_message(
             f"The time in **{self.TIMEZONES[timezone]}** (`{timezone}`) is {formatted}",
             ephemeral=hidden,
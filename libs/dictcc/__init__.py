@@ -2,4 +2,6 @@ from .client import (
     DictCC as DictCC,
     word_autocomplete_for as word_autocomplete_for,
     Node as Node,
-)
\ No newline at end of file
+)
+from .cache import DefinitionCache as DefinitionCache
+from .index import OfflineIndexes as OfflineIndexes
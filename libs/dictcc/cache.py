@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import json
+import time
+import zlib
+
+from collections import OrderedDict
+
+from .client import Node
+
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from utils import Estella
+
+    Sections = dict[str, list[tuple[Node, Node]]]
+
+
+SET_DEFINITION = """
+    INSERT INTO dictcc_definitions (lang, word, payload, fetched_at)
+        VALUES ($1, $2, $3, $4)
+    ON CONFLICT (lang, word)
+        DO UPDATE SET
+            payload = $3,
+            fetched_at = $4
+"""
+
+
+def normalize_word(word: str) -> str:
+    return " ".join(word.split()).lower()
+
+
+def encode_sections(sections: Sections) -> bytes:
+    # `Node`s are tuples, so they come out as plain json arrays.
+    return zlib.compress(json.dumps(sections, separators=(",", ":")).encode())
+
+
+def decode_sections(payload: bytes) -> Sections:
+    raw: dict[str, list[list[list[str]]]] = json.loads(zlib.decompress(payload))
+
+    return {
+        section: [(Node(*lhs), Node(*rhs)) for lhs, rhs in pairs]
+        for section, pairs in raw.items()
+    }
+
+
+class DefinitionCache:
+    """
+    Parsed `DictCC.define` results, stored compressed in the database with a small LRU in front of
+    it, so common words skip both dict.cc and parsing its page.
+    """
+
+    def __init__(
+        self,
+        bot: Estella,
+        *,
+        ttl: float = 30 * 24 * 60 * 60,
+        size: int = 256,
+    ):
+        self.bot = bot
+
+        self.ttl = ttl
+        self.size = size
+
+        self._cache: OrderedDict[tuple[str, str], tuple[float, Sections]] = (
+            OrderedDict()
+        )
+
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, key: tuple[str, str], fetched_at: float, sections: Sections):
+        self._cache[key] = (fetched_at, sections)
+        self._cache.move_to_end(key)
+
+        if len(self._cache) > self.size:
+            self._cache.popitem(last=False)
+
+    async def get(self, word: str, *, lang: str) -> Optional[Sections]:
+        key = (lang, normalize_word(word))
+        expired_before = time.time() - self.ttl
+
+        cached = self._cache.get(key)
+        if cached and cached[0] >= expired_before:
+            self._cache.move_to_end(key)
+            self.hits += 1
+
+            return cached[1]
+
+        # in case it was set, but evicted since.
+        queued = self.bot.write_queue.pending(SET_DEFINITION, key)
+        if queued and queued[3] >= expired_before:
+            sections = decode_sections(queued[2])
+            self._remember(key, queued[3], sections)
+            self.hits += 1
+
+            return sections
+
+        async with self.bot.pool.acquire() as conn:
+            row = await conn.fetchone(
+                """
+                SELECT payload, fetched_at
+                    FROM dictcc_definitions
+                WHERE lang = $1
+                AND   word = $2
+                AND   fetched_at >= $3;
+            """,
+                *key,
+                int(expired_before),
+            )
+
+        if not row:
+            self.misses += 1
+            return None
+
+        sections = decode_sections(row["payload"])
+        self._remember(key, row["fetched_at"], sections)
+        self.hits += 1
+
+        return sections
+
+    async def set(self, word: str, sections: Sections, *, lang: str):
+        key = (lang, normalize_word(word))
+        now = int(time.time())
+
+        self._remember(key, now, sections)
+
+        self.bot.write_queue.enqueue(
+            SET_DEFINITION,
+            *key,
+            encode_sections(sections),
+            now,
+            key=key,
+        )
+
+    async def prune(self):
+        async with self.bot.pool.acquire() as conn:
+            await conn.execute(
+                """
+                DELETE FROM dictcc_definitions
+                    WHERE fetched_at < $1;
+            """,
+                int(time.time() - self.ttl),
+            )
@@ -1,14 +1,17 @@
 from __future__ import annotations
 
 import re
+import time
+import asyncio
 
 from discord import app_commands
 from urllib.parse import quote_plus, urlencode
 
-from bs4 import BeautifulSoup, Tag
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 
-from typing import TYPE_CHECKING, NamedTuple
+from .parser import Heading, parse_results
+
+from typing import TYPE_CHECKING, NamedTuple, Optional
 
 if TYPE_CHECKING:
     from typing import Any, Self
@@ -19,8 +22,20 @@ if TYPE_CHECKING:
     from utils import Estella
     from ext.dictionary import Dictionary
 
+    from .cache import DefinitionCache
+    from .index import OfflineIndexes
+
+
+# how long a keystroke waits for the next one before going to dict.cc.
+AUTOCOMPLETE_DEBOUNCE = 0.25
+
+# (user id, lang) -> the autocomplete that's currently running for it.
+_autocomplete_tasks: dict[tuple[int, str], asyncio.Task[Any]] = {}
+
 
 def word_autocomplete_for(*, _from: str, _to: str, lang_id: int, lang_dir: int):
+    lang = f"{_from}{_to}"
+
     async def inner(
         interaction: Interaction["Estella"],
         current: str,
@@ -29,13 +44,40 @@ def word_autocomplete_for(*, _from: str, _to: str, lang_id: int, lang_dir: int):
             "Dictionary"
         ]  # pyright: ignore[reportAssignmentType]
 
-        cls = dict_cog.dictcc
-        search = await cls.search(
-            current,
-            lang=f"{_from}{_to}",
-            lang_id=lang_id,
-            lang_dir=lang_dir,
-        )
+        # discord only uses the response to the latest keystroke, so anything before it is
+        # cancelled (and never responded to).
+        key = (interaction.user.id, lang)
+        task = asyncio.current_task()
+        assert task
+
+        previous = _autocomplete_tasks.get(key)
+        if previous and not previous.done():
+            previous.cancel()
+
+        _autocomplete_tasks[key] = task
+
+        try:
+            cls = dict_cog.dictcc
+            search = cls.search_local(
+                current,
+                lang=lang,
+                lang_id=lang_id,
+                lang_dir=lang_dir,
+            )
+
+            # only worth waiting for the next keystroke when it'd go to dict.cc.
+            if search is None:
+                await asyncio.sleep(AUTOCOMPLETE_DEBOUNCE)
+
+                search = await cls.fetch_search(
+                    current,
+                    lang=lang,
+                    lang_id=lang_id,
+                    lang_dir=lang_dir,
+                )
+        finally:
+            if _autocomplete_tasks.get(key) is task:
+                del _autocomplete_tasks[key]
 
         return [
             app_commands.Choice(
@@ -54,16 +96,14 @@ class Node(NamedTuple):
     audio: str
 
     @classmethod
-    def from_tag(
+    def from_word(
         cls,
-        tag: Tag,
+        word: str,
         *,
         lang: str,
         lp: str,
         audio_id: str,
     ) -> Self:
-        word = " ".join(word.get_text() for word in tag.select("a:not(:has(kbd))"))
-
         url = Route(
             "GET",
             "/speak.audio.v2.php",
@@ -113,12 +153,115 @@ class Route:
         return f"<Route method={self.method!r} url={self.url!r}>"
 
 
+class SearchResult(NamedTuple):
+    words: list[str]
+    limit: int
+    expires_at: float
+
+    @property
+    def complete(self) -> bool:
+        # dict.cc had fewer suggestions than we asked for, so there's nothing more to it.
+        return len(self.words) < self.limit
+
+
+SearchKey = tuple[str, int, int, str]  # lang, lang_id, lang_dir, query
+
+
+class SearchCache:
+    """
+    LRU cache of autosuggest results, which answers longer queries from a shorter prefix whose
+    results were complete.
+    """
+
+    def __init__(self, *, size: int = 1024, ttl: float = 60 * 60):
+        self.size = size
+        self.ttl = ttl
+
+        self._cache: OrderedDict[SearchKey, SearchResult] = OrderedDict()
+
+        self.hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+
+    def _lookup(self, key: SearchKey) -> Optional[SearchResult]:
+        result = self._cache.get(key)
+        if not result:
+            return None
+
+        if result.expires_at < time.monotonic():
+            del self._cache[key]
+            return None
+
+        self._cache.move_to_end(key)
+        return result
+
+    def get(
+        self,
+        query: str,
+        *,
+        lang: str,
+        lang_id: int,
+        lang_dir: int,
+        limit: int,
+    ) -> Optional[list[str]]:
+        query = query.lower()
+
+        result = self._lookup((lang, lang_id, lang_dir, query))
+        if result and (result.complete or result.limit >= limit):
+            self.hits += 1
+            return result.words[:limit]
+
+        # the longest cached prefix is the most specific one.
+        for end in range(len(query) - 1, 1, -1):
+            result = self._lookup((lang, lang_id, lang_dir, query[:end]))
+            if not result or not result.complete:
+                continue
+
+            words = [word for word in result.words if word.lower().startswith(query)]
+
+            # dict.cc also suggests typo corrections, which a prefix can't know about.
+            if words:
+                self.prefix_hits += 1
+                return words[:limit]
+
+            break
+
+        self.misses += 1
+        return None
+
+    def set(
+        self,
+        query: str,
+        words: list[str],
+        *,
+        lang: str,
+        lang_id: int,
+        lang_dir: int,
+        limit: int,
+    ):
+        key = (lang, lang_id, lang_dir, query.lower())
+
+        self._cache[key] = SearchResult(words, limit, time.monotonic() + self.ttl)
+        self._cache.move_to_end(key)
+
+        if len(self._cache) > self.size:
+            self._cache.popitem(last=False)
+
 
 class DictCC:
     ID_ARRAY = re.compile(r"var idArr = new Array\(((?:(?:\w+),?)+)\);")
 
-    def __init__(self, *, session: ClientSession):
+    def __init__(
+        self,
+        *,
+        session: ClientSession,
+        definitions: Optional[DefinitionCache] = None,
+        index: Optional[OfflineIndexes] = None,
+    ):
         self._session = session
+        self.search_cache = SearchCache()
+        self.definitions = definitions
+        self.index = index
 
     async def request(self, route: Route) -> str:
         async with self._session.request(route.method, route.url) as req:
@@ -136,6 +279,26 @@ class DictCC:
         _from: str,
         _to: str,
     ):
+        if self.definitions:
+            cached = await self.definitions.get(word, lang=f"{_from}{_to}")
+            if cached:
+                return cached
+
+        # the dumps don't come with any recordings, their audio ids are only looked up on dict.cc
+        # once they're asked for.
+        offline = self.define_offline(word, _from=_from, _to=_to)
+        if offline:
+            return offline
+
+        return await self.fetch_definition(word, _from=_from, _to=_to)
+
+    async def fetch_definition(
+        self,
+        word: str,
+        *,
+        _from: str,
+        _to: str,
+    ) -> Optional[dict[str, list[tuple[Node, Node]]]]:
         resp = await self.request(
             Route(
                 "GET",
@@ -148,59 +311,73 @@ class DictCC:
         if "no translations found" in resp:
             return None
 
-        soup = BeautifulSoup(resp, features="html.parser")
+        rows = parse_results(resp)
+        if rows is None:
+            raise Exception(f"Couldn't find the results table for {word!r}.")
 
+        # the script with the audio ids is the only place `idArr` shows up.
         audio_ids: list[str] = []
-        script_tag = soup.select("table + script[type='text/javascript']")
-        if script_tag:
-            js = script_tag[0].get_text()
-
-            m = self.ID_ARRAY.search(js)
-            if m:
-                ids, *_ = m.groups()
-                audio_ids = ids.split(",")
+        m = self.ID_ARRAY.search(resp)
+        if m:
+            ids, *_ = m.groups()
+            audio_ids = ids.split(",")
 
         # first section will always contain the definitons
         current_section = "Definition"
         sections: dict[str, list[tuple[Node, Node]]] = defaultdict(list)
 
-        tables = soup.find_all("table")
-
-        word_table = tables[2]
-        assert isinstance(word_table, Tag)  # type-checking
-
-        rows = word_table.select("tr")
-
         for row in rows:
-            heading = row.find("td", attrs={"colspan": "4"})
-            if heading:
-                current_section = heading.get_text()
+            if isinstance(row, Heading):
+                current_section = row.text
                 continue
 
-            is_valid_def = row.select("td[class='td7cml']")
-
-            if is_valid_def:
-                row_id = int(str(row["id"]).removeprefix("tr"))
-                lhs_lang_tag, rhs_lang_tag = row.select("td[class='td7nl']")
+            lhs_lang = Node.from_word(
+                row.lhs,
+                lang=_to,
+                audio_id=audio_ids[row.row_id],
+                lp=f"{_from}{_to}",
+            )
 
-                lhs_lang = Node.from_tag(
-                    lhs_lang_tag,
-                    lang=_to,
-                    audio_id=audio_ids[row_id],
-                    lp=f"{_from}{_to}",
-                )
+            rhs_lang = Node.from_word(
+                row.rhs,
+                lang=_from,
+                audio_id=audio_ids[row.row_id],
+                lp=f"{_from}{_to}",
+            )
 
-                rhs_lang = Node.from_tag(
-                    rhs_lang_tag,
-                    lang=_from,
-                    audio_id=audio_ids[row_id],
-                    lp=f"{_from}{_to}",
-                )
+            sections[current_section].append((lhs_lang, rhs_lang))
 
-                sections[current_section].append((lhs_lang, rhs_lang))
+        if self.definitions and sections:
+            await self.definitions.set(word, sections, lang=f"{_from}{_to}")
 
         return sections
 
+    def define_offline(
+        self,
+        word: str,
+        *,
+        _from: str,
+        _to: str,
+    ) -> Optional[dict[str, list[tuple[Node, Node]]]]:
+        index = self.index and self.index.get(f"{_from}{_to}")
+        if not index:
+            return None
+
+        sections = index.define(word, lang=f"{_from}{_to}")
+        if not sections:
+            return None
+
+        return {
+            name: [
+                (
+                    Node(word=lhs, lang=_to, audio=""),
+                    Node(word=rhs, lang=_from, audio=""),
+                )
+                for lhs, rhs in pairs
+            ]
+            for name, pairs in sections.items()
+        }
+
     async def search(
         self,
         word: str,
@@ -210,9 +387,71 @@ class DictCC:
         lang_dir: int,
         limit: int = 25,
     ) -> list[str]:
+        words = self.search_local(
+            word,
+            lang=lang,
+            lang_id=lang_id,
+            lang_dir=lang_dir,
+            limit=limit,
+        )
+
+        if words is not None:
+            return words
+
+        return await self.fetch_search(
+            word,
+            lang=lang,
+            lang_id=lang_id,
+            lang_dir=lang_dir,
+            limit=limit,
+        )
+
+    def search_local(
+        self,
+        word: str,
+        *,
+        lang: str,
+        lang_id: int,
+        lang_dir: int,
+        limit: int = 25,
+    ) -> Optional[list[str]]:
+        """
+        Answers a search from the cache or the offline index, returning `None` if it has to go to
+        dict.cc.
+        """
+
         if len(word) < 2:
             return []
 
+        cached = self.search_cache.get(
+            word,
+            lang=lang,
+            lang_id=lang_id,
+            lang_dir=lang_dir,
+            limit=limit,
+        )
+
+        if cached is not None:
+            return cached
+
+        index = self.index and self.index.get(lang)
+        if index:
+            # the autocompletes ask dict.cc (through `lang_dir`) for words of the first language.
+            words = index.search(word, lang=lang[:2], limit=limit)
+            if words:
+                return words
+
+        return None
+
+    async def fetch_search(
+        self,
+        word: str,
+        *,
+        lang: str,
+        lang_id: int,
+        lang_dir: int,
+        limit: int = 25,
+    ) -> list[str]:
         resp = await self.request(
             Route(
                 "GET",
@@ -235,5 +474,15 @@ class DictCC:
 
         # since we're already filtering the lang id in the request, we don't have to worry about
         # the lang_id here amd disregard it entirely.
-        return [word for (word, *_lang_id) in pairs]
+        words = [word for (word, *_lang_id) in pairs]
+
+        self.search_cache.set(
+            word,
+            words,
+            lang=lang,
+            lang_id=lang_id,
+            lang_dir=lang_dir,
+            limit=limit,
+        )
 
+        return words
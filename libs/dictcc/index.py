@@ -0,0 +1,300 @@
+"""
+An offline index of a dict.cc word pair dump, for answering searches and definitions without
+going to dict.cc.
+
+dict.cc offers its word pairs as tab separated dumps per language pair, which are turned into an
+index with:
+
+    python -m libs.dictcc.index path/to/dump.txt db/dictcc/deen.idx --lang deen
+
+The index is a sorted array of records (one per headword and language) behind a table of
+offsets, so lookups are a binary search over a memory-mapped file. Records are keyed by the
+language of their headword first, so each side of the pair can be searched on its own.
+"""
+
+from __future__ import annotations
+
+import re
+import mmap
+import json
+import zlib
+import struct
+import pathlib
+import argparse
+
+from collections import defaultdict
+
+from typing import TYPE_CHECKING, Iterator, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    IndexSections = dict[str, list[tuple[str, str]]]
+
+
+MAGIC = b"DCCIDX2\0"
+HEADER = struct.Struct("<8s4sI")  # magic, lang, record count
+OFFSET = struct.Struct("<I")
+KEY_LENGTH = struct.Struct("<H")
+RECORD = struct.Struct("<HHI")  # key length, headword length, payload length
+
+ANNOTATIONS_RE = re.compile(r"\{[^}]*\}|\[[^\]]*\]|<[^>]*>")
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def clean_term(term: str) -> str:
+    """
+    Drops the `{n}`, `[coll.]` and `<abbr>` annotations of a term, which dict.cc doesn't show as
+    part of the word either.
+    """
+
+    return WHITESPACE_RE.sub(" ", ANNOTATIONS_RE.sub("", term)).strip()
+
+
+def index_key(word: str, *, lang: str) -> bytes:
+    return f"{lang}:{' '.join(word.split()).lower()}".encode()
+
+
+class Record(NamedTuple):
+    key: bytes
+    headword: str
+    payload: bytes
+
+    @property
+    def sections(self) -> IndexSections:
+        raw: dict[str, list[list[str]]] = json.loads(zlib.decompress(self.payload))
+        return {name: [(lhs, rhs) for lhs, rhs in pairs] for name, pairs in raw.items()}
+
+
+def read_dump(
+    path: pathlib.Path, *, reverse: bool = False
+) -> Iterator[tuple[str, str]]:
+    """
+    Yields the `(from, to)` terms of a dump, `reverse` being for dumps of the opposite direction.
+    """
+
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+
+            columns = line.rstrip("\n").split("\t")
+            if len(columns) < 2:
+                continue
+
+            _from, _to = clean_term(columns[0]), clean_term(columns[1])
+            if not _from or not _to:
+                continue
+
+            yield (_to, _from) if reverse else (_from, _to)
+
+
+def build_index(
+    dump: pathlib.Path,
+    output: pathlib.Path,
+    *,
+    lang: str,
+    reverse: bool = False,
+) -> int:
+    """
+    Builds an index out of a dump, returning the amount of headwords in it.
+
+    Pairs are stored the way the results page shows them, `to` on the left and `from` on the
+    right, and every term is indexed under its own language.
+    """
+
+    entries: defaultdict[tuple[bytes, str], dict[tuple[str, str], None]] = defaultdict(
+        dict
+    )
+
+    for _from, _to in read_dump(dump, reverse=reverse):
+        pair = (_to, _from)
+
+        entries[(index_key(_from, lang=lang[:2]), _from)][pair] = None
+        entries[(index_key(_to, lang=lang[2:]), _to)][pair] = None
+
+    records = sorted(entries.items())
+
+    offsets: list[int] = []
+    body = bytearray()
+
+    data_start = HEADER.size + OFFSET.size * len(records)
+
+    for (key, headword), pairs in records:
+        payload = zlib.compress(
+            json.dumps({"Definition": list(pairs)}, separators=(",", ":")).encode()
+        )
+        encoded_headword = headword.encode()
+
+        offsets.append(data_start + len(body))
+        body += RECORD.pack(len(key), len(encoded_headword), len(payload))
+        body += key + encoded_headword + payload
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    with output.open("wb") as f:
+        f.write(HEADER.pack(MAGIC, lang.encode(), len(records)))
+        f.write(b"".join(OFFSET.pack(offset) for offset in offsets))
+        f.write(body)
+
+    return len(records)
+
+
+class OfflineIndex:
+    def __init__(self, path: pathlib.Path):
+        with path.open("rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, lang, self.count = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(
+                f"{path} isn't a dict.cc index, or was built by an older version."
+            )
+
+        self.lang: str = lang.decode()
+
+    def _offset(self, i: int) -> int:
+        (offset,) = OFFSET.unpack_from(self._map, HEADER.size + i * OFFSET.size)
+        return offset
+
+    def _key(self, i: int) -> bytes:
+        offset = self._offset(i)
+        (key_length,) = KEY_LENGTH.unpack_from(self._map, offset)
+
+        start = offset + RECORD.size
+        return self._map[start : start + key_length]
+
+    def _record(self, i: int) -> Record:
+        offset = self._offset(i)
+        key_length, headword_length, payload_length = RECORD.unpack_from(
+            self._map, offset
+        )
+
+        start = offset + RECORD.size
+        key = self._map[start : start + key_length]
+
+        start += key_length
+        headword = self._map[start : start + headword_length].decode()
+
+        start += headword_length
+        payload = self._map[start : start + payload_length]
+
+        return Record(key, headword, payload)
+
+    def _lower_bound(self, key: bytes) -> int:
+        lo, hi = 0, self.count
+
+        while lo < hi:
+            mid = (lo + hi) // 2
+
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        return lo
+
+    def search(self, prefix: str, *, lang: str, limit: int = 25) -> list[str]:
+        """
+        The headwords of `lang` (one side of the pair, e.g. `de`) starting with `prefix`.
+        """
+
+        key = index_key(prefix, lang=lang)
+        words: dict[str, None] = {}
+
+        i = self._lower_bound(key)
+        while i < self.count and len(words) < limit:
+            record = self._record(i)
+            if not record.key.startswith(key):
+                break
+
+            words[record.headword] = None
+            i += 1
+
+        return list(words)
+
+    def define(self, word: str, *, lang: str) -> Optional[IndexSections]:
+        sections: defaultdict[str, list[tuple[str, str]]] = defaultdict(list)
+
+        # the results page matches the word on either side of the pair.
+        for side in (self.lang[:2], self.lang[2:]):
+            key = index_key(word, lang=side)
+
+            i = self._lower_bound(key)
+            while i < self.count:
+                record = self._record(i)
+                if record.key != key:
+                    break
+
+                for name, pairs in record.sections.items():
+                    sections[name].extend(pairs)
+
+                i += 1
+
+        if not sections:
+            return None
+
+        # looked up from the opposite direction, which the page shows the other way around.
+        if lang != self.lang:
+            return {
+                name: [(rhs, lhs) for lhs, rhs in pairs]
+                for name, pairs in sections.items()
+            }
+
+        return dict(sections)
+
+    def close(self):
+        self._map.close()
+
+
+class OfflineIndexes:
+    """
+    The indexes in a directory, as `{lang}.idx`, which are only opened once they're first needed.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+
+        self._indexes: dict[str, Optional[OfflineIndex]] = {}  # lang -> index
+        self._files: dict[pathlib.Path, OfflineIndex] = {}
+
+    def get(self, lang: str) -> Optional[OfflineIndex]:
+        if lang not in self._indexes:
+            self._indexes[lang] = None
+
+            # an index answers for both directions of its language pair.
+            for name in (lang, lang[2:] + lang[:2]):
+                file = self.path / f"{name}.idx"
+
+                if file.exists():
+                    if file not in self._files:
+                        self._files[file] = OfflineIndex(file)
+
+                    self._indexes[lang] = self._files[file]
+                    break
+
+        return self._indexes[lang]
+
+    def close(self):
+        for index in self._files.values():
+            index.close()
+
+        self._indexes.clear()
+        self._files.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Builds an index out of a dict.cc dump."
+    )
+    parser.add_argument("dump", type=pathlib.Path)
+    parser.add_argument("output", type=pathlib.Path)
+    parser.add_argument("--lang", required=True, help="the language pair, e.g. `deen`.")
+    parser.add_argument(
+        "--reverse",
+        action="store_true",
+        help="the dump's first column is the second language of the pair.",
+    )
+
+    args = parser.parse_args()
+
+    count = build_index(args.dump, args.output, lang=args.lang, reverse=args.reverse)
+    print(f"Indexed {count} headwords into {args.output}.")
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+from html.parser import HTMLParser
+
+from typing import NamedTuple, Optional, Union
+
+
+# the results are always in the third table of the page.
+RESULTS_TABLE = 3
+
+# the page is fed in chunks, so everything after the results table can be skipped.
+CHUNK_SIZE = 16 * 1024
+
+
+class Heading(NamedTuple):
+    text: str
+
+
+class Translation(NamedTuple):
+    row_id: int
+    lhs: str
+    rhs: str
+
+
+Row = Union[Heading, Translation]
+
+
+class _Row:
+    def __init__(self, row_id: Optional[str]):
+        self.row_id = row_id
+
+        self.heading: Optional[list[str]] = None
+        self.is_definition = False
+        self.cells: list[list[str]] = []  # the words of each `td7nl` cell.
+
+    def build(self) -> Optional[Row]:
+        if self.heading is not None:
+            return Heading("".join(self.heading))
+
+        if self.is_definition and len(self.cells) == 2 and self.row_id:
+            lhs, rhs = (" ".join(words) for words in self.cells)
+            return Translation(int(self.row_id.removeprefix("tr")), lhs, rhs)
+
+        return None
+
+
+class ResultsParser(HTMLParser):
+    """
+    Streams through a dict.cc results page, only keeping track of the rows of the results table
+    rather than building a tree of the whole page.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+
+        self.rows: list[Row] = []
+
+        self._tables = 0
+        self._depth = 0  # table nesting within the results table.
+        self._done = False
+
+        self._row: Optional[_Row] = None
+        self._in_heading = False
+        self._cell: Optional[list[str]] = None  # words of the `td7nl` cell we're in.
+        self._anchor: Optional[list[str]] = None
+        self._anchor_has_kbd = False
+
+    @property
+    def found(self) -> bool:
+        return self._tables >= RESULTS_TABLE
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, Optional[str]]]):
+        if self._done:
+            return
+
+        if tag == "table":
+            self._tables += 1
+
+            if self._depth or self._tables == RESULTS_TABLE:
+                self._depth += 1
+
+            return
+
+        if not self._depth:
+            return
+
+        if tag == "tr":
+            self._end_row()  # rows aren't always closed.
+            self._row = _Row(dict(attrs).get("id"))
+        elif tag == "td" and self._row:
+            self._end_cell()
+
+            attributes = dict(attrs)
+            if attributes.get("colspan") == "4" and self._row.heading is None:
+                self._row.heading = []
+                self._in_heading = True
+
+            if attributes.get("class") == "td7cml":
+                self._row.is_definition = True
+            elif attributes.get("class") == "td7nl":
+                self._cell = []
+                self._row.cells.append(self._cell)
+        elif tag == "a" and self._cell is not None:
+            self._anchor = []
+            self._anchor_has_kbd = False
+        elif tag == "kbd" and self._anchor is not None:
+            self._anchor_has_kbd = True
+
+    def handle_endtag(self, tag: str):
+        if not self._depth or self._done:
+            return
+
+        if tag == "table":
+            self._depth -= 1
+
+            if not self._depth:
+                self._end_row()
+                self._done = True
+        elif tag == "tr":
+            self._end_row()
+        elif tag == "td":
+            self._end_cell()
+        elif tag == "a" and self._anchor is not None:
+            if not self._anchor_has_kbd and self._cell is not None:
+                self._cell.append("".join(self._anchor))
+
+            self._anchor = None
+
+    def handle_data(self, data: str):
+        if not self._depth or self._done:
+            return
+
+        if self._in_heading and self._row and self._row.heading is not None:
+            self._row.heading.append(data)
+
+        if self._anchor is not None:
+            self._anchor.append(data)
+
+    def _end_cell(self):
+        self._in_heading = False
+        self._cell = None
+        self._anchor = None
+
+    def _end_row(self):
+        self._end_cell()
+
+        if self._row:
+            row = self._row.build()
+            if row:
+                self.rows.append(row)
+
+            self._row = None
+
+
+def parse_results(html: str) -> Optional[list[Row]]:
+    """
+    Returns `None` if the page doesn't have a results table.
+    """
+
+    parser = ResultsParser()
+
+    for start in range(0, len(html), CHUNK_SIZE):
+        parser.feed(html[start : start + CHUNK_SIZE])
+
+        if parser.done:
+            break
+    else:
+        parser.close()
+
+    return parser.rows if parser.found else None
@@ -0,0 +1,5 @@
+ALTER TABLE minecraft_heads ADD COLUMN emoji_id BIGINT;
+ALTER TABLE minecraft_heads ADD COLUMN emoji_name TEXT;
+ALTER TABLE minecraft_heads ADD COLUMN etag TEXT;
+ALTER TABLE minecraft_heads ADD COLUMN last_modified TEXT;
+ALTER TABLE minecraft_heads ADD COLUMN last_used_at TIMESTAMP;
@@ -0,0 +1,20 @@
+CREATE TABLE IF NOT EXISTS minecraft_rcon_credentials (
+    ip TEXT PRIMARY KEY,
+    port INT NOT NULL,
+    password TEXT NOT NULL,
+    assigned_by BIGINT NOT NULL
+);
+
+-- `resolution` is the bucket width in seconds, 0 being raw samples.
+CREATE TABLE IF NOT EXISTS minecraft_status_history (
+    ip TEXT NOT NULL,
+    resolution INT NOT NULL,
+    bucket INT NOT NULL, -- unix timestamp of the start of the bucket.
+    players_sum INT NOT NULL,
+    players_peak INT NOT NULL,
+    latency_sum REAL NOT NULL,
+    latency_samples INT NOT NULL,
+    online INT NOT NULL,
+    samples INT NOT NULL,
+    PRIMARY KEY (ip, resolution, bucket)
+) WITHOUT ROWID;
@@ -0,0 +1,13 @@
+-- hierarchy lookups are answered from memory, and would be by the `assigned_to` primary key
+-- otherwise; the only lookup that still reaches the database is `set_server_type`, by ip.
+CREATE INDEX IF NOT EXISTS minecraft_servers_ip_idx
+    ON minecraft_servers (ip);
+
+-- `MinecraftHeadCache.populate` loads live heads in least recently used order.
+CREATE INDEX IF NOT EXISTS minecraft_heads_lru_idx
+    ON minecraft_heads (COALESCE(last_used_at, created_at))
+    WHERE emoji_id IS NOT NULL;
+
+-- `MinecraftStatusHistory.prune` deletes by resolution and age, across every server.
+CREATE INDEX IF NOT EXISTS minecraft_status_history_prune_idx
+    ON minecraft_status_history (resolution, bucket);
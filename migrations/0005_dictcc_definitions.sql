@@ -0,0 +1,8 @@
+-- `payload` is the zlib compressed json of the parsed sections.
+CREATE TABLE IF NOT EXISTS dictcc_definitions (
+    lang TEXT NOT NULL,
+    word TEXT NOT NULL, -- normalized, see `libs.dictcc.cache.normalize_word`.
+    payload BLOB NOT NULL,
+    fetched_at INT NOT NULL, -- unix timestamp.
+    PRIMARY KEY (lang, word)
+) WITHOUT ROWID;
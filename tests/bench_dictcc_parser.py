@@ -0,0 +1,62 @@
+"""
+Times the results extraction of `parse_results` against the old BeautifulSoup path, over the
+saved results pages.
+
+    python -m tests.bench_dictcc_parser [--repeat N]
+"""
+
+import time
+import pathlib
+import argparse
+
+from typing import Callable
+
+from libs.dictcc.parser import parse_results
+
+from tests.dictcc_legacy import legacy_results
+
+
+SAVED = pathlib.Path(__file__).parent / "fixtures" / "dictcc" / "saved"
+
+
+def best_of(repeat: int, func: Callable[[str], object], page: str) -> float:
+    timings: list[float] = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(page)
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'page':<16}{'size':>10}{'bs4':>12}{'parser':>12}{'speedup':>10}")
+
+    totals = [0.0, 0.0]
+    for path in sorted(SAVED.glob("*.html")):
+        page = path.read_text(encoding="utf-8")
+        if not legacy_results(page)[0]:
+            continue
+
+        old = best_of(args.repeat, legacy_results, page)
+        new = best_of(args.repeat, parse_results, page)
+
+        totals[0] += old
+        totals[1] += new
+
+        print(
+            f"{path.stem:<16}{len(page) // 1024:>8}KB"
+            f"{old * 1000:>10.1f}ms{new * 1000:>10.1f}ms{old / new:>9.1f}x"
+        )
+
+    old, new = totals
+    print(f"{'total':<26}{old * 1000:>10.1f}ms{new * 1000:>10.1f}ms{old / new:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
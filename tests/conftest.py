@@ -0,0 +1,5 @@
+import os
+
+# `config` requires these to be set, even though nothing under test talks to discord.
+os.environ.setdefault("TOKEN", "")
+os.environ.setdefault("DEFAULT_PREFIX", "!")
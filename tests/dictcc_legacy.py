@@ -0,0 +1,98 @@
+"""
+The BeautifulSoup based extraction `DictCC.define` used before `libs.dictcc.parser`, kept as a
+reference for the tests and the benchmark.
+"""
+
+from collections import defaultdict
+from typing import Optional, Union
+
+from bs4 import BeautifulSoup, Tag
+
+from libs.dictcc import DictCC, Node
+from libs.dictcc.parser import Heading, Translation
+
+
+def legacy_words(tag: Tag) -> str:
+    return " ".join(word.get_text() for word in tag.select("a:not(:has(kbd))"))
+
+
+def legacy_results(
+    resp: str,
+) -> tuple[list[Union[Heading, Translation]], list[str]]:
+    """
+    The rows of the results table and the audio ids, the way the old code walked them.
+    """
+
+    soup = BeautifulSoup(resp, features="html.parser")
+
+    audio_ids: list[str] = []
+    script_tag = soup.select("table + script[type='text/javascript']")
+    if script_tag:
+        js = script_tag[0].get_text()
+
+        m = DictCC.ID_ARRAY.search(js)
+        if m:
+            ids, *_ = m.groups()
+            audio_ids = ids.split(",")
+
+    word_table = soup.find_all("table")[2]
+    assert isinstance(word_table, Tag)
+
+    rows: list[Union[Heading, Translation]] = []
+    for row in word_table.select("tr"):
+        heading = row.find("td", attrs={"colspan": "4"})
+        if heading:
+            rows.append(Heading(heading.get_text()))
+            continue
+
+        if row.select("td[class='td7cml']"):
+            row_id = int(str(row["id"]).removeprefix("tr"))
+            lhs_lang_tag, rhs_lang_tag = row.select("td[class='td7nl']")
+
+            rows.append(
+                Translation(
+                    row_id,
+                    legacy_words(lhs_lang_tag),
+                    legacy_words(rhs_lang_tag),
+                )
+            )
+
+    return rows, audio_ids
+
+
+def legacy_define(
+    resp: str,
+    *,
+    _from: str,
+    _to: str,
+) -> Optional[dict[str, list[tuple[Node, Node]]]]:
+    if "no translations found" in resp:
+        return None
+
+    rows, audio_ids = legacy_results(resp)
+
+    current_section = "Definition"
+    sections: dict[str, list[tuple[Node, Node]]] = defaultdict(list)
+
+    for row in rows:
+        if isinstance(row, Heading):
+            current_section = row.text
+            continue
+
+        lhs_lang = Node.from_word(
+            row.lhs,
+            lang=_to,
+            audio_id=audio_ids[row.row_id],
+            lp=f"{_from}{_to}",
+        )
+
+        rhs_lang = Node.from_word(
+            row.rhs,
+            lang=_from,
+            audio_id=audio_ids[row.row_id],
+            lp=f"{_from}{_to}",
+        )
+
+        sections[current_section].append((lhs_lang, rhs_lang))
+
+    return sections
@@ -0,0 +1,98 @@
+"""
+Generates the malformed dict.cc results pages in this directory, from a synthetic page which
+copies the markup of the real ones: `kbd` anchors, annotations, entities and the `idArr` script.
+The well formed pages live in `saved/`.
+
+    python tests/fixtures/dictcc/generate.py
+"""
+
+import re
+import random
+import pathlib
+
+HERE = pathlib.Path(__file__).parent
+
+SEED = 7
+ROWS = 40
+
+WORDS = [
+    "Haus",
+    "house",
+    "das",
+    "Gebäude",
+    "building",
+    "to go",
+    "gehen",
+    "&amp; co",
+    "Straße",
+    "Tür",
+]
+
+
+def cell(rng: random.Random) -> str:
+    parts: list[str] = []
+
+    for _ in range(rng.randint(1, 4)):
+        word = rng.choice(WORDS)
+        kind = rng.random()
+
+        if kind < 0.2:
+            parts.append(f'<a href="/?s={word}"><kbd>{word}</kbd></a>')
+        elif kind < 0.35:
+            parts.append(f'<a href="/?s={word}"><b>{word}</b> <i>x</i></a>')
+        else:
+            parts.append(f'<a href="/?s={word}">{word}</a>')
+
+        if rng.random() < 0.3:
+            parts.append(' <var title="x">{n}</var> <div class="x">[coll.]</div> ')
+
+    return " ".join(parts)
+
+
+def page(rng: random.Random, rows: int) -> str:
+    lines: list[str] = []
+    audio_ids = ["0"]
+
+    for _ in range(rows):
+        audio_ids.append(str(rng.randint(1000, 99999)))
+        lines.append(
+            f'<tr id="tr{len(audio_ids) - 1}">'
+            '<td class="td7cml"><a>x</a></td>'
+            f'<td class="td7nl" style="x">{cell(rng)}</td>'
+            f'<td class="td7nl">{cell(rng)}</td>'
+            '<td class="td7cmr"></td>'
+            "</tr>"
+        )
+
+    return (
+        "<html><head><script>var a=1;</script></head><body>\n"
+        "<table><tr><td>nav</td></tr></table>\n"
+        "<table><tr><td>search</td></tr></table>\n"
+        '<div><table id="results" width="100%">\n' + "\n".join(lines) + "\n</table>\n"
+        '<script type="text/javascript">'
+        f"var idArr = new Array({','.join(audio_ids)});var x;"
+        "</script></div>\n"
+        "<table><tr id='tr1'><td class='td7cml'></td></tr></table>\n"
+        "</body></html>\n"
+    )
+
+
+def main():
+    rng = random.Random(SEED)
+
+    # the unclosed pages nest every row into the one before it, so there aren't any headings in
+    # here; the old parser would skip the rows after one instead of failing.
+    source = page(rng, ROWS)
+    (HERE / "unclosed_source.html").write_text(source, encoding="utf-8")
+
+    # browsers (and dict.cc) are fine with cells and rows that are never closed.
+    (HERE / "unclosed_cells.html").write_text(
+        source.replace("</td>", ""), encoding="utf-8"
+    )
+    (HERE / "unclosed_rows.html").write_text(
+        re.sub(r"</t[dr]>", "", source), encoding="utf-8"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import asyncio
+import pathlib
+
+import pytest
+
+from libs.dictcc import DictCC, Node
+from libs.dictcc.index import OfflineIndexes, build_index
+
+
+DUMP = """\
+# a dict.cc dump, `de` on the left.
+Haus {n}\thouse
+Hof {m}\tcourtyard
+hoch\thigh
+Garten {m}\tgarden
+"""
+
+
+@pytest.fixture
+def indexes(tmp_path: pathlib.Path):
+    dump = tmp_path / "deen.txt"
+    dump.write_text(DUMP, encoding="utf-8")
+
+    build_index(dump, tmp_path / "deen.idx", lang="deen")
+
+    indexes = OfflineIndexes(tmp_path)
+    yield indexes
+    indexes.close()
+
+
+def test_search_only_suggests_words_of_the_language(indexes: OfflineIndexes):
+    index = indexes.get("deen")
+    assert index
+
+    assert index.search("ho", lang="de") == ["hoch", "Hof"]
+    assert index.search("ho", lang="en") == ["house"]
+
+
+def test_define_matches_either_side(indexes: OfflineIndexes):
+    index = indexes.get("deen")
+    assert index
+
+    assert index.define("haus", lang="deen") == {"Definition": [("house", "Haus")]}
+    assert index.define("house", lang="deen") == {"Definition": [("house", "Haus")]}
+
+
+def test_reversed_pair_uses_the_same_index(indexes: OfflineIndexes):
+    index = indexes.get("ende")
+    assert index is indexes.get("deen")
+
+    assert index.define("Haus", lang="ende") == {"Definition": [("Haus", "house")]}
+    assert indexes.get("sven") is None
+
+
+class CountingDictCC(DictCC):
+    requests = 0
+
+    async def request(self, route):  # pyright: ignore[reportIncompatibleMethodOverride]
+        self.requests += 1
+        raise Exception("dict.cc is unreachable.")
+
+
+def test_define_answers_from_the_index_first(indexes: OfflineIndexes):
+    dictcc = CountingDictCC(
+        session=None,  # pyright: ignore[reportArgumentType]
+        index=indexes,
+    )
+
+    sections = asyncio.run(dictcc.define("Haus", _from="de", _to="en"))
+    assert sections == {
+        "Definition": [
+            (
+                Node(word="house", lang="en", audio=""),
+                Node(word="Haus", lang="de", audio=""),
+            )
+        ]
+    }
+    assert dictcc.requests == 0
+
+    with pytest.raises(Exception, match="unreachable"):
+        asyncio.run(dictcc.define("Tür", _from="de", _to="en"))
+    assert dictcc.requests == 1
@@ -0,0 +1,101 @@
+import asyncio
+import pathlib
+
+import pytest
+
+from libs.dictcc import DictCC
+from libs.dictcc.parser import parse_results
+
+from tests.dictcc_legacy import legacy_define, legacy_results
+
+
+FIXTURES = pathlib.Path(__file__).parent / "fixtures" / "dictcc"
+
+# results pages as dict.cc serves them, the malformed ones are generated by `generate.py`.
+SAVED = FIXTURES / "saved"
+PAGES = [SAVED / "de-en_Haus.html", SAVED / "sv-en_hus.html"]
+NO_RESULTS = SAVED / "de-en_no_results.html"
+
+# `unclosed_source.html` with its cells, and then its rows as well, left unclosed.
+UNCLOSED_SOURCE = "unclosed_source.html"
+
+
+class PageDictCC(DictCC):
+    """
+    Answers every request with the same page.
+    """
+
+    def __init__(self, page: str):
+        super().__init__(session=None)  # pyright: ignore[reportArgumentType]
+        self.page = page
+
+    async def request(self, route):  # pyright: ignore[reportIncompatibleMethodOverride]
+        return self.page
+
+
+def read(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def define(page: str):
+    return asyncio.run(PageDictCC(page).define("Haus", _from="de", _to="en"))
+
+
+@pytest.mark.parametrize("path", PAGES, ids=lambda p: p.stem)
+def test_parse_results_matches_beautifulsoup(path: pathlib.Path):
+    page = path.read_text(encoding="utf-8")
+
+    rows, audio_ids = legacy_results(page)
+    assert rows and audio_ids
+
+    assert parse_results(page) == rows
+
+
+@pytest.mark.parametrize("path", PAGES, ids=lambda p: p.stem)
+def test_define_matches_beautifulsoup(path: pathlib.Path):
+    page = path.read_text(encoding="utf-8")
+
+    assert define(page) == legacy_define(page, _from="de", _to="en")
+
+
+def test_unclosed_cells():
+    page = read("unclosed_cells.html")
+    expected = legacy_define(read(UNCLOSED_SOURCE), _from="de", _to="en")
+
+    # every cell ends up nested in the one before it, taking its words along.
+    assert legacy_define(page, _from="de", _to="en") != expected
+    assert define(page) == expected
+
+
+def test_unclosed_rows():
+    page = read("unclosed_rows.html")
+
+    # every row ends up nested in the one before it, so the first has all of their cells.
+    with pytest.raises(ValueError):
+        legacy_define(page, _from="de", _to="en")
+
+    assert define(page) == legacy_define(read(UNCLOSED_SOURCE), _from="de", _to="en")
+
+
+def test_saved_page_sections():
+    sections = define((SAVED / "de-en_Haus.html").read_text(encoding="utf-8"))
+    assert sections
+
+    assert list(sections) == [
+        "Definition",
+        "Verben",
+        "Substantive",
+        "Redewendungen",
+        "Unvollständige Treffer",
+    ]
+
+    house, haus = sections["Definition"][0]
+    assert (house.word, haus.word) == ("house", "Haus")
+    assert "id=" in haus.audio and "id=0" not in haus.audio
+
+
+def test_no_results():
+    page = NO_RESULTS.read_text(encoding="utf-8")
+
+    assert legacy_define(page, _from="de", _to="en") is None
+    assert define(page) is None
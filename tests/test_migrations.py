@@ -0,0 +1,96 @@
+import asyncio
+import pathlib
+import sqlite3
+import contextlib
+
+import asqlite
+import pytest
+
+from utils.database import InstrumentedPool
+from utils.migrations import get_migrations, migrate
+
+
+ROOT = pathlib.Path(__file__).parent.parent
+
+
+async def _migrate(path: pathlib.Path) -> int:
+    pool = InstrumentedPool(await asqlite.create_pool(str(path)))
+
+    try:
+        return await migrate(pool)
+    finally:
+        await pool.close()
+
+
+@pytest.fixture
+def database(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> pathlib.Path:
+    # migrations are looked up relative to the working directory.
+    monkeypatch.chdir(ROOT)
+
+    path = tmp_path / "data.db"
+    assert asyncio.run(_migrate(path)) == len(get_migrations())
+
+    return path
+
+
+def plan(database: pathlib.Path, sql: str, *parameters: object) -> list[str]:
+    with contextlib.closing(sqlite3.connect(database)) as conn:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+
+    return [row[3] for row in rows]
+
+
+def test_migrate_skips_applied_migrations(database: pathlib.Path):
+    assert asyncio.run(_migrate(database)) == 0
+
+
+def test_heads_are_loaded_in_lru_order_from_the_index(database: pathlib.Path):
+    assert (
+        plan(
+            database,
+            """
+        SELECT
+            uuid, emoji_id, emoji_name, emoji_hash,
+            etag, last_modified, last_updated_at
+        FROM minecraft_heads
+        WHERE emoji_id IS NOT NULL
+        ORDER BY COALESCE(last_used_at, created_at);
+        """,
+        )
+        == ["SCAN minecraft_heads USING INDEX minecraft_heads_lru_idx"]
+    )
+
+
+def test_history_is_pruned_from_a_covering_index(database: pathlib.Path):
+    assert (
+        plan(
+            database,
+            """
+        DELETE FROM minecraft_status_history
+            WHERE resolution = ?
+            AND   bucket < ?;
+        """,
+            300,
+            0,
+        )
+        == [
+            "SEARCH minecraft_status_history USING COVERING INDEX "
+            "minecraft_status_history_prune_idx (resolution=? AND bucket<?)"
+        ]
+    )
+
+
+def test_server_type_is_updated_by_ip(database: pathlib.Path):
+    assert (
+        plan(
+            database,
+            """
+        UPDATE minecraft_servers
+            SET minecraft_server_type = ?
+        WHERE ip = ?;
+        """,
+            2,
+            "mc.example.com",
+        )
+        == ["SEARCH minecraft_servers USING INDEX minecraft_servers_ip_idx (ip=?)"]
+    )
@@ -10,11 +10,13 @@ from .functions import (
     convert_data_uri,
     variants,
     clamp,
+    sparkline,
 )
 
 from .motd import motd_to_ansi
 from .logging import logger
 from .subclasses import Estella, Tree
+from .writer import WriteQueue
 from .audio import generate_waveform_from_audio
 
 if TYPE_CHECKING:
@@ -33,10 +35,12 @@ __all__ = (
     "convert_data_uri",
     "variants",
     "clamp",
+    "sparkline",
     "motd_to_ansi",
     "logger",
     "Estella",
     "Tree",
+    "WriteQueue",
     "generate_waveform_from_audio",
     "Interaction",
 )
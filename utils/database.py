@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import re
+import math
+import time
+
+from collections import defaultdict
+
+from .logging import logger
+
+from typing import TYPE_CHECKING, Any, Generator, Optional
+
+if TYPE_CHECKING:
+    import sqlite3
+    import asqlite
+
+    from types import TracebackType
+
+
+WHITESPACE_RE = re.compile(r"\s+")
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|(?<![\w$])\d+(?:\.\d+)?\b")
+
+
+def normalize_statement(sql: str) -> str:
+    """
+    Collapses a statement into a single line, with any literals replaced by `?`, so every
+    execution of it lands in the same histogram.
+    """
+
+    sql = WHITESPACE_RE.sub(" ", sql).strip().rstrip(";")
+    return LITERAL_RE.sub("?", sql)
+
+
+class Histogram:
+    """
+    Log-scaled histogram of durations, with buckets from 0.1ms growing by ~19% each.
+    """
+
+    BASE = 1e-4
+    GROWTH = 2**0.25
+
+    def __init__(self):
+        self.buckets: defaultdict[int, int] = defaultdict(int)
+
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        bucket = (
+            int(math.log(seconds / self.BASE, self.GROWTH)) + 1
+            if seconds > self.BASE
+            else 0
+        )
+
+        self.buckets[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percentile: float) -> float:
+        """
+        The upper bound of the bucket the percentile falls in.
+        """
+
+        if not self.count:
+            return 0.0
+
+        rank = math.ceil(percentile / 100 * self.count)
+
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+
+            if seen >= rank:
+                return min(self.BASE * self.GROWTH**bucket, self.max)
+
+        return self.max
+
+
+class DatabaseStats:
+    def __init__(self, *, slow_threshold: float):
+        self.slow_threshold = slow_threshold
+
+        self.acquire = Histogram()
+        self.statements: defaultdict[str, Histogram] = defaultdict(Histogram)
+
+    def record(self, sql: str, seconds: float):
+        statement = normalize_statement(sql)
+        self.statements[statement].record(seconds)
+
+        if seconds >= self.slow_threshold:
+            logger.warning("Slow statement (%.1fms): %s", seconds * 1000, statement)
+
+    def reset(self):
+        self.acquire = Histogram()
+        self.statements.clear()
+
+
+class _TimedExecute:
+    """
+    Wraps the result of `execute` and friends, which can be either awaited or used as an async
+    context manager.
+    """
+
+    def __init__(self, stats: DatabaseStats, sql: str, inner: Any):
+        self.stats = stats
+        self.sql = sql
+        self.inner = inner
+
+        self._start = 0.0
+
+    def __await__(self) -> Generator[Any, None, Any]:
+        start = time.perf_counter()
+
+        try:
+            return (yield from self.inner.__await__())
+        finally:
+            self.stats.record(self.sql, time.perf_counter() - start)
+
+    async def __aenter__(self) -> Any:
+        self._start = time.perf_counter()
+        return await self.inner.__aenter__()
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ):
+        try:
+            await self.inner.__aexit__(exc_type, exc_value, traceback)
+        finally:
+            self.stats.record(self.sql, time.perf_counter() - self._start)
+
+
+class InstrumentedConnection:
+    def __init__(self, conn: asqlite.ProxiedConnection, stats: DatabaseStats):
+        self._conn = conn
+        self._stats = stats
+
+    def transaction(self) -> asqlite.Transaction:
+        return self._conn.transaction()
+
+    async def rollback(self):
+        await self._conn.rollback()
+
+    def execute(self, sql: str, /, *parameters: Any) -> Any:
+        return _TimedExecute(self._stats, sql, self._conn.execute(sql, *parameters))
+
+    def executemany(self, sql: str, seq_of_parameters: Any) -> Any:
+        return _TimedExecute(
+            self._stats, sql, self._conn.executemany(sql, seq_of_parameters)
+        )
+
+    def executescript(self, sql_script: str) -> Any:
+        return _TimedExecute(
+            self._stats, sql_script, self._conn.executescript(sql_script)
+        )
+
+    async def fetchone(self, sql: str, /, *parameters: Any) -> sqlite3.Row:
+        start = time.perf_counter()
+
+        try:
+            return await self._conn.fetchone(sql, *parameters)
+        finally:
+            self._stats.record(sql, time.perf_counter() - start)
+
+    async def fetchmany(
+        self,
+        sql: str,
+        /,
+        *parameters: Any,
+        size: Optional[int] = None,
+    ) -> list[sqlite3.Row]:
+        start = time.perf_counter()
+
+        try:
+            return await self._conn.fetchmany(sql, *parameters, size=size)
+        finally:
+            self._stats.record(sql, time.perf_counter() - start)
+
+    async def fetchall(self, sql: str, /, *parameters: Any) -> list[sqlite3.Row]:
+        start = time.perf_counter()
+
+        try:
+            return await self._conn.fetchall(sql, *parameters)
+        finally:
+            self._stats.record(sql, time.perf_counter() - start)
+
+
+class _InstrumentedAcquire:
+    def __init__(self, pool: InstrumentedPool):
+        self.pool = pool
+        self._conn: Optional[asqlite.ProxiedConnection] = None
+
+    async def __aenter__(self) -> InstrumentedConnection:
+        start = time.perf_counter()
+        self._conn = await self.pool.pool.acquire()
+        self.pool.stats.acquire.record(time.perf_counter() - start)
+
+        return InstrumentedConnection(self._conn, self.pool.stats)
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ):
+        if self._conn is not None:
+            await self.pool.pool.release(self._conn)
+            self._conn = None
+
+
+class InstrumentedPool:
+    """
+    A thin layer over an `asqlite.Pool` that times how long acquiring a connection waits, and how
+    long every statement takes.
+    """
+
+    def __init__(self, pool: asqlite.Pool, *, slow_threshold: float = 0.25):
+        self.pool = pool
+        self.stats = DatabaseStats(slow_threshold=slow_threshold)
+
+    def acquire(self) -> _InstrumentedAcquire:
+        return _InstrumentedAcquire(self)
+
+    async def close(self):
+        await self.pool.close()
@@ -87,3 +87,24 @@ def clamp(
         return target[: length - len(end)] + end
 
     return target
+
+
+SPARK_BARS = "\u2581\u2582\u2583\u2584\u2585\u2586\u2587\u2588"
+
+
+def sparkline(values: list[Optional[float]]) -> str:
+    present = [value for value in values if value is not None]
+    if not present:
+        return ""
+
+    low, high = min(present), max(present)
+    scale = (high - low) or 1
+
+    return "".join(
+        (
+            " "
+            if value is None
+            else SPARK_BARS[round((value - low) / scale * (len(SPARK_BARS) - 1))]
+        )
+        for value in values
+    )
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import re
+import pathlib
+
+from .logging import logger
+
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from .database import InstrumentedPool
+
+
+MIGRATIONS_PATH = pathlib.Path("migrations")
+MIGRATION_RE = re.compile(r"(?P<version>\d+)_(?P<name>\w+)\.sql")
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    path: pathlib.Path
+
+
+def get_migrations(path: pathlib.Path = MIGRATIONS_PATH) -> list[Migration]:
+    migrations: list[Migration] = []
+
+    for file in path.glob("*.sql"):
+        match = MIGRATION_RE.fullmatch(file.name)
+        if not match:
+            logger.warning("Ignoring misnamed migration: %s", file.name)
+            continue
+
+        migrations.append(Migration(int(match["version"]), match["name"], file))
+
+    return sorted(migrations)
+
+
+async def migrate(pool: InstrumentedPool) -> int:
+    """
+    Applies every migration newer than the database's `schema_version`, each in a transaction of
+    its own. Returns the amount of migrations applied.
+    """
+
+    async with pool.acquire() as conn:
+        await conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INT PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """
+        )
+
+        row = await conn.fetchone("SELECT MAX(version) FROM schema_version;")
+        current: int = row[0] or 0
+
+        pending = [m for m in get_migrations() if m.version > current]
+
+        for migration in pending:
+            logger.info("Applying migration %s: %s", migration.version, migration.name)
+
+            # `executescript` commits whatever is open before running, so the transaction has
+            # to be a part of the script itself.
+            script = (
+                "BEGIN;\n"
+                f"{migration.path.read_text()}\n"
+                "INSERT INTO schema_version (version, name) "
+                f"VALUES ({migration.version}, '{migration.name}');\n"
+                "COMMIT;"
+            )
+
+            try:
+                await conn.executescript(script)
+            except Exception:
+                await conn.rollback()
+                raise
+
+    return len(pending)
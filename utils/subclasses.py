@@ -14,6 +14,11 @@ import asqlite
 from aiohttp import ClientSession
 
 from .logging import logger
+from .writer import WriteQueue
+from .database import InstrumentedPool
+from .migrations import migrate
+
+from config import SLOW_QUERY_THRESHOLD
 
 from typing import TYPE_CHECKING
 
@@ -22,18 +27,14 @@ if TYPE_CHECKING:
 
 
 async def blacklist_check(interaction: discord.Interaction[Estella]):
-    if await interaction.client.is_owner(interaction.user):
-        return True
-
-    async with interaction.client.pool.acquire() as conn:
-        blacklisted = await conn.fetchone(
-            "SELECT EXISTS (SELECT 1 FROM bot_blacklist WHERE user_id = $1)",
-            interaction.user.id,
-        )
+    # this runs before every interaction, so it shouldn't ever have to wait on anything.
+    bot = interaction.client
+    user_id = interaction.user.id
 
-        blacklisted = blacklisted[0]
+    if bot.is_owner_id(user_id):
+        return True
 
-    if blacklisted:
+    if user_id in bot.blacklisted:
         await interaction.response.send_message(
             "You are blacklisted. Please contact the owner to get whitelisted again.",
             ephemeral=True,
@@ -53,12 +54,25 @@ class Estella(commands.Bot):
         self.tree.interaction_check = blacklist_check
 
         logger.info("Connecting to database.")
-        self.pool = await asqlite.create_pool("db/data.db")
+        self.pool = InstrumentedPool(
+            await asqlite.create_pool("db/data.db"),
+            slow_threshold=SLOW_QUERY_THRESHOLD,
+        )
 
         logger.info("Setting up database.")
+        applied = await migrate(self.pool)
+        if applied:
+            logger.info(f"Applied {applied} migration{['s', ''][applied == 1]}.")
+
         async with self.pool.acquire() as conn:
-            with open("schema.sql") as f:
-                await conn.executescript(f.read())
+            rows = await conn.fetchall("SELECT user_id FROM bot_blacklist")
+
+        self.blacklisted: set[int] = {row["user_id"] for row in rows}
+
+        await self.resolve_owners()
+
+        self.write_queue = WriteQueue(self)
+        self.write_queue.start()
 
         await self.load_extension("jishaku")
 
@@ -71,6 +85,31 @@ class Estella(commands.Bot):
 
         logger.info(f"Logged in as {self.user}")
 
+    async def resolve_owners(self):
+        """
+        Resolves the owners up front, so `is_owner` never has to fetch the application info.
+        """
+
+        if self.owner_id or self.owner_ids:
+            return
+
+        app = await self.application_info()
+        if app.team:
+            self.owner_ids = {
+                member.id
+                for member in app.team.members
+                if member.role
+                in (discord.TeamMemberRole.admin, discord.TeamMemberRole.developer)
+            }
+        else:
+            self.owner_id = app.owner.id
+
+    def is_owner_id(self, user_id: int) -> bool:
+        if self.owner_id:
+            return user_id == self.owner_id
+
+        return user_id in (self.owner_ids or ())
+
     async def send_voice_message(
         self,
         channel_id: int,
@@ -107,6 +146,7 @@ class Estella(commands.Bot):
         logger.info("Cleaning up...")
 
         await super().close()
+        await self.write_queue.close()
         await self.session.close()
         await self.pool.close()
 
@@ -93,7 +93,7 @@ class BaseView(ui.View):
             trace_back,
         )
 
-        is_owner = await interaction.client.is_owner(interaction.user)
+        is_owner = interaction.client.is_owner_id(interaction.user.id)
 
         if is_owner:
             error_message = to_cb(trace_back, lang="py")
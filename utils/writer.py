@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import asyncio
+
+from .logging import logger
+
+from typing import TYPE_CHECKING, Any, Hashable, Optional
+
+if TYPE_CHECKING:
+    from .subclasses import Estella
+
+
+class WriteQueue:
+    """
+    Write-behind queue for upserts, which are coalesced by the row they write to and committed
+    together in a single transaction.
+    """
+
+    def __init__(
+        self,
+        bot: Estella,
+        *,
+        flush_interval: float = 2,
+        batch_size: int = 100,
+    ):
+        self.bot = bot
+
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        # (query, key) -> arguments, in the order they were (last) queued.
+        self._pending: dict[tuple[str, Hashable], tuple[Any, ...]] = {}
+        self._flushing: dict[tuple[str, Hashable], tuple[Any, ...]] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task[None]] = None
+        self._batch_task: Optional[asyncio.Task[None]] = None
+
+        self.flushes = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def start(self):
+        if not self._task:
+            self._task = self.bot.loop.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            # taken first, so a flush that's already running finishes instead of being cancelled.
+            async with self._lock:
+                self._task.cancel()
+
+            self._task = None
+
+        await self.flush()
+
+    def enqueue(self, query: str, *args: Any, key: Hashable):
+        """
+        Queues a write, replacing any queued write of the same query to the same `key` (usually
+        the primary key of the row).
+        """
+
+        pending_key = (query, key)
+
+        # re-inserted, so it's written after everything that was queued before it.
+        if self._pending.pop(pending_key, None) is not None:
+            self.coalesced += 1
+
+        self._pending[pending_key] = args
+
+        if len(self._pending) >= self.batch_size and not (
+            self._batch_task and not self._batch_task.done()
+        ):
+            self._batch_task = self.bot.loop.create_task(self.flush())
+            self._batch_task.add_done_callback(self._on_batch_flushed)
+
+    def pending(self, query: str, key: Hashable) -> Optional[tuple[Any, ...]]:
+        """
+        The arguments of a write that isn't committed yet, so reads can see it without flushing.
+        """
+
+        pending_key = (query, key)
+
+        args = self._pending.get(pending_key)
+        if args is None:
+            args = self._flushing.get(pending_key)
+
+        return args
+
+    def _on_batch_flushed(self, task: asyncio.Task[None]):
+        if not task.cancelled() and task.exception():
+            logger.error("Failed to flush queued writes: %s", task.exception())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+
+            try:
+                await self.flush()
+            except Exception as err:
+                logger.error("Failed to flush queued writes: %s", err)
+
+    async def flush(self):
+        """
+        Writes everything queued so far, for callers which need to read their own writes.
+        """
+
+        async with self._lock:
+            if not self._pending:
+                return
+
+            pending, self._pending = self._pending, {}
+            self._flushing = pending
+
+            # consecutive writes of the same query are batched, without reordering anything.
+            batches: list[tuple[str, list[tuple[Any, ...]]]] = []
+            for (query, _), args in pending.items():
+                if batches and batches[-1][0] == query:
+                    batches[-1][1].append(args)
+                else:
+                    batches.append((query, [args]))
+
+            try:
+                async with self.bot.pool.acquire() as conn:
+                    async with conn.transaction():
+                        for query, rows in batches:
+                            await conn.executemany(query, rows)
+            except BaseException:
+                self._requeue(pending)
+                raise
+            finally:
+                self._flushing = {}
+
+            self.flushes += 1
+
+    def _requeue(self, pending: dict[tuple[str, Hashable], tuple[Any, ...]]):
+        # put back in front of anything queued since, unless it was queued again in the meantime.
+        for pending_key in self._pending:
+            pending.pop(pending_key, None)
+
+        pending.update(self._pending)
+        self._pending = pending